@@ -1,15 +1,8 @@
-from .kao import Chapter
-from .kao import Downloader
-from .kao import Manga18Downloader
-from .kao import ManhuascanDownloader
-from .kao import PersonalDownloader
-from .kao import ReaperScansDownloader
-from .kao import WebtoonDownloader
-from .kao import MangasOriginesDownloader
-from .kao import MangasOriginesXDownloader
-from .kao import MangaScantradDownloader
-from .kao import Logger
-from .kao import FileLogger
-from .kao import ConsoleLogger
-from .kao import kao_utils
-from .kao import downloader_utils
+from . import kao
+
+__all__ = kao.__all__
+
+
+def __getattr__(name: str):
+    # the names of the kao package are imported on first use (see kao/__init__.py)
+    return getattr(kao, name)
@@ -1,16 +1,47 @@
-from . import kao_utils
-from .downloaders import downloader_utils
-from .downloaders import Chapter
-from .downloaders import Series
-from .downloaders import Downloader
-from .downloaders import Manga18Downloader
-from .downloaders import ManhuascanDownloader
-from .downloaders import PersonalDownloader
-from .downloaders import ReaperScansDownloader
-from .downloaders import WebtoonDownloader
-from .downloaders import MangasOriginesDownloader
-from .downloaders import MangasOriginesXDownloader
-from .downloaders import MangaScantradDownloader
-from .loggers import ConsoleLogger
-from .loggers import FileLogger
-from .loggers import Logger
+import importlib
+
+# public name -> package defining it, imported on first use so that the command line starts without loading the
+# downloaders and their dependencies (cloudscraper, lxml, Pillow, numpy, ...)
+_lazy_names = {
+    "downloader_utils": ".downloaders",
+    "Chapter": ".downloaders",
+    "Series": ".downloaders",
+    "Downloader": ".downloaders",
+    "AsyncDownloader": ".downloaders",
+    "Manga18Downloader": ".downloaders",
+    "ManhuascanDownloader": ".downloaders",
+    "PersonalDownloader": ".downloaders",
+    "ReaperScansDownloader": ".downloaders",
+    "WebtoonDownloader": ".downloaders",
+    "MangasOriginesDownloader": ".downloaders",
+    "MangasOriginesXDownloader": ".downloaders",
+    "MangaScantradDownloader": ".downloaders",
+    "ConsoleLogger": ".loggers",
+    "FileLogger": ".loggers",
+    "Logger": ".loggers",
+    "MemoryLogger": ".loggers",
+    "AssemblyOptions": ".pipelines",
+    "AssemblyPipeline": ".pipelines",
+    "RecompressionProfile": ".pipelines",
+    "DownloaderRegistry": ".registries",
+    "Ledger": ".storages",
+    "ImageStore": ".storages",
+    "JunkLibrary": ".storages",
+    "Transport": ".transports",
+    "StreamingPdfWriter": ".writers",
+}
+# modules given as is
+_lazy_modules = ["kao_utils", "parser_utils"]
+
+__all__ = _lazy_modules + list(_lazy_names)
+
+
+def __getattr__(name: str):
+    if name in _lazy_modules:
+        value = importlib.import_module("." + name, __name__)
+    elif name in _lazy_names:
+        value = getattr(importlib.import_module(_lazy_names[name], __name__), name)
+    else:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    globals()[name] = value
+    return value
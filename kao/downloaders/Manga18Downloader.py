@@ -1,10 +1,12 @@
 import base64
 import re
+from typing import Callable, Optional
+
 from lxml import etree
 
 from . import Series, Chapter, Downloader
-from .. import kao_utils
-from ..loggers import Logger
+from ..loggers import Logger, logger_utils
+from ..transports import Transport
 
 
 class Manga18Downloader(Downloader):
@@ -12,21 +14,14 @@ class Manga18Downloader(Downloader):
     Downloader to scrape manga18.club series or chapters
     """
     platform = "Manga18.club"
+    _pictures_script_xpath = etree.XPath('/html/body/div[3]/div[5]/script[1]')
 
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
-        super().__init__(base_dir, loggers)
-
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?manga18\.club/manhwa/((\w*-*%*)+\d*)/?$", link) is not None
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?manga18\.club/manhwa/.+/(\w+-)?\d+/?$", link) is not None
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
+        super().__init__(base_dir, loggers, transport)
 
-    @staticmethod
-    def extract_pictures_links_from_webpage(dom: etree._Element) -> list[str]:
-        js_scpipt_with_pictures = dom.xpath('/html/body/div[3]/div[5]/script[1]')[0].text
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom: etree._Element) -> list[str]:
+        js_scpipt_with_pictures = cls._pictures_script_xpath(dom)[0].text
 
         js_array_of_pictures = re.search(r'var slides_p_path = \[((("\w+(=?)*")+,)+)];',
                                          js_scpipt_with_pictures).group(0)
@@ -45,9 +40,9 @@ class Manga18Downloader(Downloader):
         if link[len(link) - 1] != "/":
             link += "/"
 
-        kao_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
+        logger_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
 
-        soup, dom = self._get_page_content(link)
+        soup, dom = self._get_page_content(link, self.listing_cache_ttl)
 
         series_title = self._clear_name(soup.find('div', {'class': 'detail_name'}).find('h1').text)
 
@@ -61,20 +56,25 @@ class Manga18Downloader(Downloader):
         return series
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
 
-        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs)
+        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
 
-        kao_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
+        logger_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
 
         return series
 
     def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
                          full_logs: bool = False) -> Chapter:
+        chapter = self._get_downloaded_chapter(link, force_re_dl)
+        if chapter is not None:
+            return chapter
+
         soup, dom = self._get_page_content(link)
 
         series_title = self._clear_name(soup.find('div', {'class': 'story_name'}).find('h1').text)
         series_chapter = self._clear_name(soup.find('div', {'class': 'chapter_name'}).find('span').text)
 
         return self._download_chapter_files(dom, series_title, series_chapter, 'https://manga18.club', force_re_dl,
-                                            keep_img, full_logs)
+                                            keep_img, full_logs, link)
@@ -1,12 +1,11 @@
-import re
+from typing import Callable, Optional
 
-from bs4 import BeautifulSoup
 from lxml import etree
 
 from . import downloader_utils
-from .bases import Series, Chapter, Downloader
-from .. import kao_utils
-from ..loggers import Logger
+from .bases import Series, Chapter, Downloader, HtmlNode
+from ..loggers import Logger, logger_utils
+from ..transports import Transport
 
 
 class MangasOriginesDownloader(Downloader):
@@ -14,23 +13,14 @@ class MangasOriginesDownloader(Downloader):
     Downloader to scrape Mangas-Origines series or chapters
     """
     platform = "Mangas-Origines"
+    _pictures_xpath = etree.XPath('//*[@class="reading-content"]//img')
 
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
-        super().__init__(base_dir, loggers)
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
+        super().__init__(base_dir, loggers, transport)
 
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?mangas-origines\.fr/manga/[\w\-%]+/?$", link) is not None
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        return re.search(
-            r"https?://(www\.)?mangas-origines\.fr/manga/[\w\-%]+/chapitre-\d+([\w\-%]+)?/?(\?style=(list|paged))?$",
-            link) is not None
-
-    @staticmethod
-    def extract_pictures_links_from_webpage(dom: etree._Element) -> list[str]:
-        img_tags = dom.xpath('//*[@class="reading-content"]//img')
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom: etree._Element) -> list[str]:
+        img_tags = cls._pictures_xpath(dom)
         pictures_links = []
 
         for img_tag in img_tags:
@@ -42,26 +32,26 @@ class MangasOriginesDownloader(Downloader):
 
         return pictures_links
 
-    def _get_chapters_from_series(self, link: str) -> BeautifulSoup:
+    def _get_chapters_from_series(self, link: str) -> HtmlNode:
         """
         MangaOrigines has a pagination system for the chapters list.
         :param link: str - the link of the series
-        :return: BeautifulSoup - the html content of the chapters list page
+        :return: HtmlNode - the html content of the chapters list page
         """
         headers = {
             'User-Agent': downloader_utils.user_agent,
             'referer': link
         }
-        response = self.scraper.post("{}ajax/chapters/".format(link), headers=headers)
-        soup = BeautifulSoup(response.content, "html.parser")
+        content = self._fetch_page("{}ajax/chapters/".format(link), "POST", self.listing_cache_ttl, headers)
+        soup = HtmlNode.parse(content)
         return soup
 
     def create_series(self, link: str) -> Series:
         if link[len(link) - 1] != "/":
             link += "/"
 
-        kao_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
-        soup, _ = self._get_page_content(link)
+        logger_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
+        soup, _ = self._get_page_content(link, self.listing_cache_ttl)
         soup_chapters = self._get_chapters_from_series(link)
 
         series_title = self._clear_name(soup.find("div", {"class": "post-title"}).find("h1").text)
@@ -76,16 +66,21 @@ class MangasOriginesDownloader(Downloader):
         return series
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
 
-        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs)
+        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
 
-        kao_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
+        logger_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
 
         return series
 
     def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
                          full_logs: bool = False) -> Chapter:
+        chapter = self._get_downloaded_chapter(link, force_re_dl)
+        if chapter is not None:
+            return chapter
+
         if "?style=list" not in link:
             link += "?style=list"
 
@@ -95,4 +90,4 @@ class MangasOriginesDownloader(Downloader):
         series_chapter = self._clear_name(soup.select_one(".breadcrumb > .active").text)
 
         return self._download_chapter_files(dom, series_title, series_chapter, 'https://mangas-origines.fr/',
-                                            force_re_dl, keep_img, full_logs)
+                                            force_re_dl, keep_img, full_logs, link)
@@ -1,10 +1,10 @@
-import re
+from typing import Callable, Optional
 
 from lxml import etree
 
 from .bases import Series, Chapter, Downloader
-from .. import kao_utils
-from ..loggers import Logger
+from ..loggers import Logger, logger_utils
+from ..transports import Transport
 
 
 class ManhuascanDownloader(Downloader):
@@ -12,21 +12,17 @@ class ManhuascanDownloader(Downloader):
     Downloader to scrape Manhuascan series or chapters
     """
     platform = "Manhuascan"
+    _pictures_xpath = etree.XPath('/html/body/div[2]/div[2]/div[1]/div/article/div[3]/div[5]/img')
+    _series_title_xpath = etree.XPath("/html/body/div[2]/div/div[2]/article/div[1]/div[2]/div[1]/div[1]/div/h1")
+    _chapter_series_title_xpath = etree.XPath("/html/body/div[2]/div[2]/div[1]/div/article/div[1]/div/a")
+    _chapter_title_xpath = etree.XPath("//*[@id='chapter']//option[@selected='selected']")
 
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
-        super().__init__(base_dir, loggers)
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
+        super().__init__(base_dir, loggers, transport)
 
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?manhuascan\.us/manga/[\w\-%]+/?$", link) is not None
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?manhuascan\.us/manga/.+/([\w\-%]+)?\d+/?$", link) is not None
-
-    @staticmethod
-    def extract_pictures_links_from_webpage(dom: etree._Element) -> list[str]:
-        img_tags = dom.xpath('/html/body/div[2]/div[2]/div[1]/div/article/div[3]/div[5]/img')
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom: etree._Element) -> list[str]:
+        img_tags = cls._pictures_xpath(dom)
 
         pictures_links = list(map(lambda img_tag: img_tag.get("src"), img_tags))
 
@@ -36,12 +32,11 @@ class ManhuascanDownloader(Downloader):
         if link[len(link) - 1] != "/":
             link += "/"
 
-        kao_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
+        logger_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
 
-        soup, dom = self._get_page_content(link)
+        soup, dom = self._get_page_content(link, self.listing_cache_ttl)
 
-        series_title = self._clear_name(
-            dom.xpath("/html/body/div[2]/div/div[2]/article/div[1]/div[2]/div[1]/div[1]/div/h1")[0].text)
+        series_title = self._clear_name(self._series_title_xpath(dom)[0].text)
 
         series = self._generate_series(series_title, link)
 
@@ -53,20 +48,25 @@ class ManhuascanDownloader(Downloader):
         return series
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
 
-        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs)
+        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
 
-        kao_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
+        logger_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
 
         return series
 
     def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
                          full_logs: bool = False) -> Chapter:
+        chapter = self._get_downloaded_chapter(link, force_re_dl)
+        if chapter is not None:
+            return chapter
+
         soup, dom = self._get_page_content(link)
 
-        series_title = self._clear_name(dom.xpath("/html/body/div[2]/div[2]/div[1]/div/article/div[1]/div/a")[0].text)
-        series_chapter = self._clear_name(dom.xpath("//*[@id='chapter']//option[@selected='selected']")[0].text)
+        series_title = self._clear_name(self._chapter_series_title_xpath(dom)[0].text)
+        series_chapter = self._clear_name(self._chapter_title_xpath(dom)[0].text)
 
         return self._download_chapter_files(dom, series_title, series_chapter, 'https://manhuascan.us', force_re_dl,
-                                            keep_img, full_logs)
+                                            keep_img, full_logs, link)
@@ -1,10 +1,10 @@
 import os
-import validators
+from typing import Callable, Optional
 
 from . import downloader_utils
 from .bases import Series, Chapter, Downloader
-from .. import kao_utils
-from ..loggers import Logger
+from ..loggers import Logger, logger_utils
+from ..transports import Transport
 
 
 class PersonalDownloader(Downloader):
@@ -13,20 +13,8 @@ class PersonalDownloader(Downloader):
     """
     platform = "PersonalDownloader"
 
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
-        super().__init__(base_dir, loggers)
-
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        if validators.url(link):
-            return False
-        return not downloader_utils.folder_contains_files([os.path.join(link, p) for p in os.listdir(link)])
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        if validators.url(link):
-            return False
-        return downloader_utils.folder_contains_files([os.path.join(link, p) for p in os.listdir(link)])
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
+        super().__init__(base_dir, loggers, transport)
 
     def create_series(self, link: str) -> Series:
         series_title = link[link.rfind(os.sep) + 1:]
@@ -40,7 +28,8 @@ class PersonalDownloader(Downloader):
         return series
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
 
         total_chapters = len(series.get_all_chapter_links())
 
@@ -48,6 +37,8 @@ class PersonalDownloader(Downloader):
             folder = series.get_chapter_link(index)
             chapter = self.download_chapter(folder, force_re_dl, keep_img, full_logs)
             series.add_chapter(chapter)
+            if on_chapter_downloaded is not None:
+                on_chapter_downloaded(chapter)
 
         return series
 
@@ -64,6 +55,7 @@ class PersonalDownloader(Downloader):
         chapter = Chapter(series_name, chap_name, self.platform)
         chapter.set_path(link)
 
-        kao_utils.log(self.loggers, "[Info][{}][Chapter] '{}': Complete".format(self.platform, chapter.get_full_name()))
+        logger_utils.log(self.loggers, "[Info][{}][Chapter] '{}': Complete"
+                         .format(self.platform, chapter.get_full_name()))
 
         return chapter
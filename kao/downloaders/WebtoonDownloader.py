@@ -1,10 +1,10 @@
-import re
+from typing import Callable, Optional
 
 from lxml import etree
 
 from .bases import Series, Chapter, Downloader
-from .. import kao_utils
-from ..loggers import Logger
+from ..loggers import Logger, logger_utils
+from ..transports import Transport
 
 
 class WebtoonDownloader(Downloader):
@@ -12,25 +12,20 @@ class WebtoonDownloader(Downloader):
     Downloader to scrape Webtoon.com series or chapters
     """
     platform = "Webtoon"
-
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
-        super().__init__(base_dir, loggers)
+    # episodes are published weekly, the episodes list does not need to be requested again for an hour
+    listing_cache_ttl = 60 * 60
+    _pictures_xpath = etree.XPath("/html/body/div[1]/div[2]/div[3]/div[1]/div/div/img")
+    _last_episode_xpath = etree.XPath("/html/body/div[1]/div[3]/div/div[2]/div[2]/div[1]/ul/li[1]/a")
+    _series_title_xpath = etree.XPath('//*[@id="toolbar"]/div[1]/div/a')
+    _chapter_title_xpath = etree.XPath('//*[@id="toolbar"]/div[1]/div/h1')
+
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
+        super().__init__(base_dir, loggers, transport)
         self._set_cookies(dict(pagGDPR='true'))
 
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        return re.search(r"https?://(www\.)?webtoons\.com/\w{2}/[\w\-%]+/[\w\-%]+/list\?title_no=\d+$",
-                         link) is not None
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        return re.search(
-            r"https?://(www\.)?webtoons\.com/\w{2}/[\w\-%]+/[\w\-%]+/[a-zA-Z\d-]+/viewer\?title_no=\d*&episode_no=\d+$",
-            link) is not None
-
-    @staticmethod
-    def extract_pictures_links_from_webpage(dom: etree._Element) -> list[str]:
-        img_html_elements = dom.xpath("/html/body/div[1]/div[2]/div[3]/div[1]/div/div/img")
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom: etree._Element) -> list[str]:
+        img_html_elements = cls._pictures_xpath(dom)
         pictures_links = []
         for element in img_html_elements:
             if element.get('data-url').find("https://webtoon-phinf.pstatic.net/") != -1:
@@ -40,13 +35,11 @@ class WebtoonDownloader(Downloader):
         return pictures_links
 
     def create_series(self, link: str) -> Series:
-        soup, dom = self._get_page_content(link)
+        soup, dom = self._get_page_content(link, self.listing_cache_ttl)
 
         base_link = link.split("/list?title_no")[0]
         series_id = link.split("title_no=")[1]
-        last_ep_number = \
-            dom.xpath("/html/body/div[1]/div[3]/div/div[2]/div[2]/div[1]/ul/li[1]/a")[0].get("href").split(
-                "&episode_no=")[1]
+        last_ep_number = self._last_episode_xpath(dom)[0].get("href").split("&episode_no=")[1]
 
         series_title = self._clear_name(soup.find("h1", {"class": "subj"}).text)
 
@@ -60,21 +53,26 @@ class WebtoonDownloader(Downloader):
         return series
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
-        kao_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
+        logger_utils.log(self.loggers, "[Info][{}][Series] Get HTML content".format(self.platform))
 
-        self._download_chapters_from_series(series, force_re_dl, keep_img)
+        self._download_chapters_from_series(series, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
 
-        kao_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
+        logger_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
 
         return series
 
     def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
                          full_logs: bool = False) -> Chapter:
+        chapter = self._get_downloaded_chapter(link, force_re_dl)
+        if chapter is not None:
+            return chapter
+
         soup, dom = self._get_page_content(link)
 
-        series_title = self._clear_name(dom.xpath('//*[@id="toolbar"]/div[1]/div/a')[0].text)
-        series_chapter = self._clear_name(dom.xpath('//*[@id="toolbar"]/div[1]/div/h1')[0].text)
+        series_title = self._clear_name(self._series_title_xpath(dom)[0].text)
+        series_chapter = self._clear_name(self._chapter_title_xpath(dom)[0].text)
 
         return self._download_chapter_files(dom, series_title, series_chapter, 'https://www.webtoons.com', force_re_dl,
-                                            keep_img, full_logs)
+                                            keep_img, full_logs, link)
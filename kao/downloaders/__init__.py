@@ -1,12 +1,29 @@
+import importlib
+
 from . import downloader_utils
-from .bases import Downloader
-from .bases import Chapter
-from .bases import Series
-from .Manga18Downloader import Manga18Downloader
-from .ManhuascanDownloader import ManhuascanDownloader
-from .PersonalDownloader import PersonalDownloader
-from .ReaperScansDownloader import ReaperScansDownloader
-from .WebtoonDownloader import WebtoonDownloader
-from .MangasOriginesDownloader import MangasOriginesDownloader
-from .MangasOriginesXDownloader import MangasOriginesXDownloader
-from .MangaScantradDownloader import MangaScantradDownloader
+
+# class name -> module defining it, the downloaders and their dependencies (cloudscraper, lxml, ...) are imported on
+# first use
+_lazy_classes = {
+    "Downloader": ".bases",
+    "AsyncDownloader": ".bases",
+    "Chapter": ".bases",
+    "Series": ".bases",
+    "HtmlNode": ".bases",
+    "Manga18Downloader": ".Manga18Downloader",
+    "ManhuascanDownloader": ".ManhuascanDownloader",
+    "PersonalDownloader": ".PersonalDownloader",
+    "ReaperScansDownloader": ".ReaperScansDownloader",
+    "WebtoonDownloader": ".WebtoonDownloader",
+    "MangasOriginesDownloader": ".MangasOriginesDownloader",
+    "MangasOriginesXDownloader": ".MangasOriginesXDownloader",
+    "MangaScantradDownloader": ".MangaScantradDownloader",
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_classes:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    value = getattr(importlib.import_module(_lazy_classes[name], __name__), name)
+    globals()[name] = value
+    return value
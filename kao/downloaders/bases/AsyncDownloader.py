@@ -0,0 +1,115 @@
+import asyncio
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+from . import Series, Chapter, Downloader
+from .. import downloader_utils
+from ...loggers import logger_utils
+
+
+class AsyncDownloader:
+    """
+    Asyncio engine on top of a Downloader
+    Blocking calls of the downloader (requests, parsing, file writes) run in worker threads, so the event loop can keep
+    many chapters of many platforms in flight. The on-disk output is the one of the wrapped downloader.
+    """
+    # number of chapters downloaded at the same time from the same host
+    max_chapters_per_host = 4
+
+    def __init__(self, downloader: Downloader, hosts_semaphores: dict[str, asyncio.Semaphore] = None):
+        self.downloader = downloader
+        self.platform = downloader.platform
+        self.loggers = downloader.loggers
+        # shared between engines so platforms hosted on the same domain share the same limit
+        self.hosts_semaphores = hosts_semaphores if hosts_semaphores is not None else {}
+
+    def _get_host_semaphore(self, link: str) -> asyncio.Semaphore:
+        """
+        Get the semaphore limiting the requests to the host of the link
+        :param link: str - link to request
+        :return: asyncio.Semaphore - semaphore of the host
+        """
+        host = urlparse(link).netloc or self.platform
+        if host not in self.hosts_semaphores:
+            self.hosts_semaphores[host] = asyncio.Semaphore(self.max_chapters_per_host)
+        return self.hosts_semaphores[host]
+
+    async def create_series(self, link: str) -> Series:
+        """
+        Create a series with all its chapters from the link
+        :param link: str - link of the series
+        :return: Series - series created
+        """
+        async with self._get_host_semaphore(link):
+            return await asyncio.to_thread(self.downloader.create_series, link)
+
+    async def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
+                               full_logs: bool = False) -> Chapter:
+        """
+        Download the chapter from the link
+        :param link: str - link of the chapter
+        :param force_re_dl: bool - True to force the re-download of the chapter
+        :param keep_img: bool - True to keep the images after the download on the chapter folder
+        :param full_logs: bool - True to display full logs
+        :return: Chapter - the downloaded chapter
+        """
+        async with self._get_host_semaphore(link):
+            return await asyncio.to_thread(self.downloader.download_chapter, link, force_re_dl, keep_img, full_logs)
+
+    async def _download_series_chapter(self, series: Series, index: int, force_re_dl: bool, keep_img: bool,
+                                       full_logs: bool,
+                                       on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None
+                                       ) -> Optional[Chapter]:
+        """
+        Download one chapter of the series with the retries of the wrapped downloader
+        :param series: Series - series of the chapter
+        :param index: int - index of the chapter link in the series
+        :param force_re_dl: bool - True to force the re-download of the chapter
+        :param keep_img: bool - True to keep the images after the download on the chapter folder
+        :param full_logs: bool - True to display full logs
+        :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called with the chapter once downloaded
+        :return: Optional[Chapter] - the downloaded chapter, None when all retries failed
+        """
+        async with self._get_host_semaphore(series.get_chapter_link(index)):
+            chapter = await asyncio.to_thread(self.downloader._download_chapter_with_retries, series, index,
+                                              force_re_dl, keep_img, full_logs)
+        if chapter is not None and on_chapter_downloaded is not None:
+            await asyncio.to_thread(on_chapter_downloaded, chapter)
+        return chapter
+
+    async def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
+                              full_logs: bool = False,
+                              on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
+        """
+        Download the new chapters of the series concurrently, chapters are added to the series in the website order
+        :param series: Series - series object to download
+        :param force_re_dl: bool - True to force the re-download of the series
+        :param keep_img: bool - True to keep the images after the download on the chapter folder
+        :param full_logs: bool - True to display full logs
+        :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called in a worker thread with each
+         chapter once downloaded (in completion order)
+        :return: Series - the downloaded series
+        """
+        total_chapters = len(series.get_all_chapter_links())
+        fingerprint, known_links = await asyncio.to_thread(self.downloader._get_series_known_links, series,
+                                                           force_re_dl)
+        indexes = [index for index, link in enumerate(series.get_all_chapter_links())
+                   if downloader_utils.canonical_link(link) not in known_links]
+        logger_utils.log(self.loggers, "[Info][{}][Series] Start downloading {} chaps from '{}' ({} new)"
+                         .format(self.platform, total_chapters, series.name, len(indexes)))
+        await asyncio.to_thread(self.downloader._submit_known_chapters, series, known_links, on_chapter_downloaded)
+
+        chapters = await asyncio.gather(*(
+            self._download_series_chapter(series, index, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
+            for index in indexes
+        ))
+        for index, chapter in zip(indexes, chapters):
+            if chapter is not None:
+                series.add_chapter(chapter)
+                known_links.add(downloader_utils.canonical_link(series.get_chapter_link(index)))
+
+        await asyncio.to_thread(self.downloader._save_series_known_links, series, fingerprint, known_links)
+
+        logger_utils.log(self.loggers, "[Info][{}][series] '{}': completed".format(self.platform, series.get_name()))
+
+        return series
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Union
 
 
 class Chapter:
@@ -7,6 +7,8 @@ class Chapter:
         self.name = name
         self.platform = platform
         self.path = None
+        # pictures of a chapter downloaded without keeping its images, until its file is created
+        self.images = None
 
     def get_name(self) -> str:
         return self.name
@@ -25,3 +27,9 @@ class Chapter:
 
     def get_path(self) -> Optional[str]:
         return self.path
+
+    def set_images(self, images: Optional[list[Union[str, tuple[str, bytes]]]]) -> None:
+        self.images = images
+
+    def get_images(self) -> Optional[list[Union[str, tuple[str, bytes]]]]:
+        return self.images
@@ -1,18 +1,22 @@
+import hashlib
 import os
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from os import path
 from pathlib import Path
+from typing import Callable, Optional, Union
 
-import cloudscraper
 import unidecode
 from PIL import Image
-from bs4 import BeautifulSoup
 from lxml import etree
 
-from . import Series, Chapter
+from . import Series, Chapter, HtmlNode
 from .. import downloader_utils
-from ... import kao_utils
-from ...loggers import Logger
+from ...loggers import Logger, logger_utils
+from ...storages import Ledger, HttpCache, ChapterManifest, ImageStore, JunkLibrary
+from ...transports import Transport
 
 
 class Downloader:
@@ -20,53 +24,48 @@ class Downloader:
     Abstract class to download scans from a website
     """
     platform = None
-
-    def __init__(self, base_dir: str, loggers: list[Logger] = None):
+    # the XPath selectors of the downloaders are compiled once for the class
+    # number of pictures fetched at the same time when downloading a chapter, set for each platform by the registry
+    max_pictures_workers = 4
+    # pictures are streamed by chunks of this size (bytes)
+    picture_chunk_size = 64 * 1024
+    # maximum number of bytes read to find the header of a picture
+    picture_max_header_size = 4 * 1024 * 1024
+    # seconds during which a cached series / chapters list page is used without asking the website
+    listing_cache_ttl = 10 * 60
+    # bytes of pictures of a chapter kept in memory when the images are not kept, the next ones are written on disk
+    max_in_memory_chapter_size = 128 * 1024 * 1024
+
+    def __init__(self, base_dir: str, loggers: list[Logger] = None, transport: Optional[Transport] = None):
         self.base_dir = os.path.join(base_dir, self.platform)
         self.loggers = loggers
+        self.ledger = Ledger(base_dir, self.platform)
+        self.http_cache = HttpCache.for_directory(os.path.join(base_dir, ".http_cache"))
         self.cookies = None
-        self.scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'firefox',
-                'platform': 'windows',
-                'mobile': False
-            },
-        )
-
-    @staticmethod
-    def is_a_series_link(link: str) -> bool:
-        """
-        Check if the given link is a link of a series
-        :param link: str - https://myWebsite.com/series/seriesName
-        :return: bool - True if the link is a link of a series
-        """
-        raise "Not Implemented"
-
-    @staticmethod
-    def is_a_chapter_link(link: str) -> bool:
-        """
-        Check if the given link is a link of a chapter
-        :param link: str - https://myWebsite.com/series/seriesName/chapterName
-        :return: bool - True if the link is a chapter link
-        """
-        raise "Not Implemented"
+        # pictures are deduplicated in a content-addressed store when it is set (see set_image_store)
+        self.image_store: Optional[ImageStore] = None
+        # pages near a known credit or ad page of the platform are dropped
+        self.junk_library = JunkLibrary(os.path.join(self.base_dir, JunkLibrary.folder_name))
+        # the transport (and its pools of kept-alive connections) is shared by all downloaders by default
+        self.transport = transport if transport is not None else Transport.get_shared()
+        self.scraper = self.transport.session
 
     @staticmethod
     def _create_skeleton(chapter_path: str) -> None:
         """
         Create the skeleton of the chapter
-        Remove the chapter folder if it already exists
+        Remove the chapter folder if it already exists, unless it holds an unfinished download to resume
         :param str - chapter_path: path to the chapter
         :return: None
         """
         # remove folder with all its content if it already exists
-        if path.exists(chapter_path):
+        if path.exists(chapter_path) and not ChapterManifest.exists(chapter_path):
             shutil.rmtree(chapter_path)
 
         downloader_utils.create_directory(chapter_path)
 
-    @staticmethod
-    def extract_pictures_links_from_webpage(dom: etree._Element) -> list[str]:
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom: etree._Element) -> list[str]:
         """
         Extract the pictures links from the webpage
         :param dom: etree._Element - the dom of the webpage
@@ -74,56 +73,54 @@ class Downloader:
         """
         raise "Not Implemented"
 
-    @staticmethod
-    def _clear_images(chapter_path: str) -> None:
-        """
-        Remove all images from the chapter folder to save space
-        :param chapter_path: str - path to the chapter
-        :return: None
-        """
-        for file_to_delete in downloader_utils.find_images_in_tree(chapter_path):
-            os.remove(file_to_delete)
-
-    @staticmethod
-    def _is_chapter_already_downloaded(series_path: str, chapter_name: str,
-                                      file_name: str = "downloaded_chapters.txt") -> bool:
+    def _is_chapter_already_downloaded(self, series_path: str, chapter_name: str,
+                                       file_name: str = "downloaded_chapters.txt") -> bool:
         """
         Check if the chapter is already downloaded
+        The downloaded chapters file of the series (written by the previous versions) is imported in the ledger once
         :param series_path: str - path to the series
         :param chapter_name: str - name of the chapter
         :param file_name: str - name of the file containing the downloaded chapters
         :return: bool - True if the chapter is already downloaded
         """
-        file_path = path.join(series_path, file_name)
+        series_name = path.basename(series_path)
+        self.ledger.import_text_file(series_name, path.join(series_path, file_name))
 
-        if path.exists(file_path) and path.isfile(file_path):
-            with open(file_path, "r") as f:
-                for line in f:
-                    if line.strip() == chapter_name:
-                        return True
-        return False
+        return self.ledger.is_downloaded(series_name, chapter_name)
 
-    @staticmethod
-    def _add_chapter_to_downloaded_chapters(series_path: str, chapter_name: str,
-                                            file_name: str = "downloaded_chapters.txt") -> None:
+    def _add_chapter_to_downloaded_chapters(self, series_path: str, chapter_name: str,
+                                            pictures: list[Union[str, tuple[str, bytes]]] = None,
+                                            link: Optional[str] = None) -> None:
         """
-        Add the chapter to the downloaded chapters file
+        Add the chapter to the ledger of the downloaded chapters
         :param series_path: str - path to the series
         :param chapter_name: str - name of the chapter
-        :param file_name: str - name of the file containing the downloaded chapters
+        :param pictures: list[Union[str, tuple[str, bytes]]] - paths or (name, content) of the downloaded pictures
+        :param link: Optional[str] - link of the chapter
         :return: None
         """
-        file_path = path.join(series_path, file_name)
+        pictures = pictures if pictures is not None else []
+        size = sum(len(picture[1]) if isinstance(picture, tuple) else path.getsize(picture) for picture in pictures)
 
-        if not path.exists(series_path):
-            downloader_utils.create_directory(series_path)
+        self.ledger.add_chapter(path.basename(series_path), chapter_name, len(pictures), size, link=link)
 
-        if not path.exists(file_path):
-            with open(file_path, "w") as f:
-                f.write(chapter_name + "\n")
-        else:
-            with open(file_path, "a") as f:
-                f.write(chapter_name + "\n")
+    def _get_downloaded_chapter(self, link: str, force_re_dl: bool = False) -> Optional[Chapter]:
+        """
+        Get the chapter of the link when it is already downloaded, without requesting the website
+        :param link: str - link of the chapter
+        :param force_re_dl: bool - True to force the re-download of the chapter
+        :return: Optional[Chapter] - the downloaded chapter, None when the chapter has to be downloaded
+        """
+        if force_re_dl:
+            return None
+        names = self.ledger.get_chapter_by_link(link)
+        if names is None:
+            return None
+
+        series_name, chapter_name = names
+        logger_utils.log(self.loggers, "[Info][{}][Chapter] Chapter '{}' from '{}' is already downloaded"
+                         .format(self.platform, chapter_name, series_name))
+        return Chapter(series_name, chapter_name, self.platform)
 
     def _set_cookies(self, cookies: dict) -> None:
         """
@@ -133,16 +130,225 @@ class Downloader:
         """
         self.cookies = cookies
 
+    def set_image_store(self, image_store: Optional[ImageStore]) -> None:
+        """
+        Set the store where the downloaded pictures are deduplicated, None to save the pictures in the chapters only
+        :param image_store: Optional[ImageStore] - store of the pictures
+        :return: None
+        """
+        self.image_store = image_store
+
+    def _get_picture(self, link: str, headers: dict, part_path: Optional[str]) -> dict:
+        """
+        Stream a picture from the website to a temporary file, or to memory when no file is given
+        The first chunk is enough to detect fake pictures and to read the format and the size of the picture, so the
+        download is aborted before writing anything when the picture would be skipped
+        :param link: str - link of the picture
+        :param headers: dict - headers to use for the request
+        :param part_path: Optional[str] - path of the temporary file to write, None to keep the picture in memory
+        :return: dict - {status: 'ok' | 'error' | 'fake' | 'skipped', probe: ImageProbe, path: part_path,
+         data: content of a picture kept in memory, content: first bytes of a fake picture, hash: sha256 of a picture
+         written on disk when the image store is set}
+        """
+        with self._request("GET", link, headers, stream=True) as img_response:
+            if img_response.status_code != 200:
+                return {"status": "error"}
+
+            chunks = img_response.iter_content(chunk_size=self.picture_chunk_size)
+            header = b''
+            img_probe = None
+            # read chunks until the header of the picture can be parsed
+            for chunk in chunks:
+                header += chunk
+                # check the content because some sites return 200 even if the img is a fake img
+                # Example: when Scantrad put on their site images from Webtoons, the last img of the chapter is a
+                # fake img with an "OK" content
+                if header == b'OK' or b'Bad Request' in header:
+                    break
+                try:
+                    img_probe = downloader_utils.probe_image(header)
+                    break
+                except Image.DecompressionBombError:
+                    return {"status": "skipped"}
+                except Exception:
+                    if len(header) >= self.picture_max_header_size:
+                        raise
+            if header == b'OK' or b'Bad Request' in header:
+                return {"status": "fake", "content": header[:100]}
+            if img_probe is None:
+                # raise the parsing error of the whole content
+                downloader_utils.probe_image(header)
+            if img_probe.is_too_small() or img_probe.is_too_large():
+                return {"status": "skipped", "probe": img_probe}
+            if part_path is None:
+                return {"status": "ok", "probe": img_probe, "data": header + b''.join(chunks)}
+
+            # the picture is hashed while it is written, for the image store
+            digest = hashlib.sha256(header) if self.image_store is not None else None
+            try:
+                with open(part_path, "wb") as f:
+                    f.write(header)
+                    for chunk in chunks:
+                        f.write(chunk)
+                        if digest is not None:
+                            digest.update(chunk)
+            except Exception:
+                if path.exists(part_path):
+                    os.remove(part_path)
+                raise
+
+        download = {"status": "ok", "probe": img_probe, "path": part_path}
+        if digest is not None:
+            download["hash"] = digest.hexdigest()
+        return download
+
+    def _get_stored_picture(self, digest: str, img_probe: downloader_utils.ImageProbe,
+                            part_path: Optional[str]) -> Optional[dict]:
+        """
+        Get a picture already downloaded from the image store, instead of fetching it from the website
+        :param digest: str - hash of the picture
+        :param img_probe: ImageProbe - format, size and mode of the picture
+        :param part_path: Optional[str] - path where to link the picture, None to read the picture in memory
+        :return: Optional[dict] - same as _get_picture() with stored: True, None if the picture is not in the store
+        """
+        if self.image_store.is_blocked(digest):
+            return {"status": "blocked", "probe": img_probe, "hash": digest, "stored": True}
+        if not self.image_store.has(digest, img_probe.format):
+            return None
+        download = {"status": "ok", "probe": img_probe, "hash": digest, "stored": True}
+        if part_path is None:
+            download["data"] = self.image_store.read(digest, img_probe.format)
+        else:
+            self.image_store.link_to(digest, img_probe.format, part_path)
+            download["path"] = part_path
+        return download
+
+    def _store_picture(self, download: dict, keep_img: bool = True) -> dict:
+        """
+        Add a fetched picture to the image store, a picture of the blocklist is dropped
+        The pictures of the chapters whose images are not kept are only hashed: they are removed once the file of the
+        chapter is built, so nothing would link them again from the store
+        :param download: dict - fetched picture, see _get_picture()
+        :param keep_img: bool - True when the images are kept on the chapter folder
+        :return: dict - the picture with its hash, or a 'blocked' status
+        """
+        img_extension = download["probe"].format
+        if not keep_img:
+            if "data" in download:
+                download["hash"] = self.image_store.hash_content(download["data"])
+            elif "hash" not in download:
+                download["hash"] = self.image_store.hash_file(download["path"])
+        elif "data" in download:
+            download["hash"] = self.image_store.add_content(download["data"], img_extension)
+        else:
+            download["hash"] = self.image_store.add_file(download["path"], img_extension, download.get("hash"))
+        if self.image_store.is_blocked(download["hash"]):
+            if "path" in download and path.exists(download["path"]):
+                os.remove(download["path"])
+            return {"status": "blocked", "probe": download["probe"], "hash": download["hash"]}
+        return download
+
+    def _get_page(self, manifest: ChapterManifest, index: int, link: str, headers: dict,
+                  in_memory: bool = False, known_picture: Optional[tuple[str, downloader_utils.ImageProbe]] = None,
+                  keep_img: bool = True) -> dict:
+        """
+        Get a page of the chapter: from the manifest when a previous attempt already fetched it, from the image store
+        when the link was already downloaded, else from the website
+        A page fetched on disk is moved to its staging path and recorded in the manifest, a page kept in memory is
+        recorded only if the chapter fails
+        :param manifest: ChapterManifest - manifest of the chapter
+        :param index: int - index of the page in the pictures links
+        :param link: str - link of the picture
+        :param headers: dict - headers to use for the request
+        :param in_memory: bool - True to keep the fetched picture in memory
+        :param known_picture: Optional[tuple[str, ImageProbe]] - hash and probe of the picture when the link was
+         already downloaded
+        :param keep_img: bool - True when the images are kept on the chapter folder, else the fetched picture is not
+         added to the image store
+        :return: dict - {status: 'ok' | 'error' | 'fake' | 'skipped' | 'blocked' | 'junk' | 'exception',
+         probe: ImageProbe, path: staging path, data: content of a picture kept in memory, content: first bytes of a
+         fake picture, hash: sha256 of the picture when the image store is set, exception, resumed: bool, stored: bool}
+        """
+        entry = manifest.get_page(index)
+        if entry is not None:
+            download = dict(entry, resumed=True)
+            if entry["status"] == "ok":
+                download["probe"] = downloader_utils.ImageProbe(*entry["probe"])
+                download["path"] = manifest.get_staging_path(index, download["probe"].format)
+            return download
+
+        part_path = None if in_memory else manifest.get_part_path(index)
+        try:
+            download = None
+            if self.image_store is not None and known_picture is not None:
+                download = self._get_stored_picture(*known_picture, part_path)
+            if download is None:
+                download = self._get_picture(link, headers, part_path)
+                if self.image_store is not None and download["status"] == "ok":
+                    download = self._store_picture(download, keep_img)
+            if download["status"] == "ok" and self.junk_library.is_junk(
+                    (link, download["data"]) if "data" in download else download["path"]):
+                if "path" in download:
+                    os.remove(download["path"])
+                download = {key: value for key, value in download.items() if key not in ("path", "data")}
+                download["status"] = "junk"
+        except Exception as e:
+            return {"status": "exception", "exception": e}
+        if in_memory:
+            # the pictures kept in memory are recorded only when the chapter fails (see _download_pictures)
+            return download
+        return self._record_page(manifest, index, download)
+
+    @staticmethod
+    def _record_page(manifest: ChapterManifest, index: int, download: dict) -> dict:
+        """
+        Record a fetched page in the manifest of the chapter, so the next attempt does not fetch it again
+        A picture fetched on disk is moved to its staging path, a picture kept in memory is written to it
+        :param manifest: ChapterManifest - manifest of the chapter
+        :param index: int - index of the page in the pictures links
+        :param download: dict - fetched page, see _get_page()
+        :return: dict - the page, with its staging path for a picture fetched on disk
+        """
+        if download["status"] == "ok":
+            staging_path = manifest.get_staging_path(index, download["probe"].format)
+            if "data" in download:
+                with open(staging_path + ".tmp", "wb") as f:
+                    f.write(download["data"])
+                os.replace(staging_path + ".tmp", staging_path)
+            else:
+                os.replace(download["path"], staging_path)
+                download["path"] = staging_path
+            entry = {"status": "ok", "probe": list(download["probe"])}
+            if "hash" in download:
+                entry["hash"] = download["hash"]
+            manifest.set_page(index, entry)
+        elif download["status"] == "fake":
+            manifest.set_page(index, {"status": "fake", "content": str(download["content"])})
+        elif download["status"] in ("skipped", "blocked", "junk"):
+            manifest.set_page(index, {"status": download["status"]})
+        return download
+
     def _download_pictures(self, chapter_path: str, pictures_links: list[str], referer: str,
-                           full_logs: bool = False) -> None:
+                           full_logs: bool = False, keep_img: bool = True) -> list[Union[str, tuple[str, bytes]]]:
         """
         Download all pictures from the list of pictures links
+        Pictures are fetched in parallel (see max_pictures_workers) but saved in the order of the list
+        Each picture is streamed to a temporary file and renamed once complete, so it is never fully held in memory
+        Fetched pictures are recorded in the manifest of the chapter, so a retry only fetches the missing ones
+        With the image store, the pictures whose link was already downloaded are taken from the store and the pictures
+        of the blocklist are dropped
+        The pages near a known credit or ad page of the platform (see JunkLibrary) are dropped
+        When the images are not kept, pictures stay in memory (up to max_in_memory_chapter_size bytes) to be given
+        directly to the creation of the chapter file
         :param chapter_path: str - path to the chapter
         :param pictures_links: list[str] - list of pictures links
         :param referer: str - referer to use for the request (ex: myWebsite.com for myWebsite.com/series/seriesName)
         :param full_logs: bool - True to display full logs
-        :return: None
+        :param keep_img: bool - True to keep the images on the chapter folder
+        :return: list[Union[str, tuple[str, bytes]]] - paths of the saved pictures, (name, content) of the pictures
+         kept in memory
         """
+        pictures = []
         counter = 1
         total_pictures = len(pictures_links)
         zfill_required = len(str(total_pictures))
@@ -150,68 +356,171 @@ class Downloader:
             'User-Agent': downloader_utils.user_agent,
             'referer': referer
         }
-        for link in pictures_links:
+        manifest = ChapterManifest(chapter_path, pictures_links)
+        known_pictures = self.ledger.get_pictures(pictures_links) if self.image_store is not None else {}
+        in_memory_size = [0]
+        in_memory_lock = threading.Lock()
+
+        def get_page(index: int, picture_link: str) -> dict:
+            with in_memory_lock:
+                in_memory = not keep_img and in_memory_size[0] < self.max_in_memory_chapter_size
+            page = self._get_page(manifest, index, picture_link, headers, in_memory,
+                                  known_pictures.get(downloader_utils.canonical_link(picture_link)), keep_img)
+            if "data" in page:
+                with in_memory_lock:
+                    in_memory_size[0] += len(page["data"])
+            return page
+
+        with ThreadPoolExecutor(max_workers=self.max_pictures_workers) as executor:
+            # map keeps the order of the links, so pictures are still numbered like on the website
+            downloads = list(executor.map(get_page, range(0, total_pictures), pictures_links))
+
+        junk_pictures = len([download for download in downloads if download["status"] == "junk"])
+        if junk_pictures > 0:
+            logger_utils.log(self.loggers, "[Info][{}][Chapter] {} known credit or ad pages dropped"
+                             .format(self.platform, junk_pictures))
+        resumed_pictures = len([download for download in downloads if download.get("resumed")])
+        if resumed_pictures > 0:
+            logger_utils.log(self.loggers, "[Info][{}][Chapter] Resumed: {}/{} pictures already downloaded"
+                             .format(self.platform, resumed_pictures, total_pictures))
+        if self.image_store is not None:
+            stored_pictures = len([download for download in downloads if download.get("stored")])
+            if stored_pictures > 0:
+                logger_utils.log(self.loggers, "[Info][{}][Chapter] Deduplicated: {}/{} pictures taken from the image "
+                                               "store".format(self.platform, stored_pictures, total_pictures))
+            # remember the hash of the fetched pictures, next time they are taken from the store
+            self.ledger.set_pictures({link: (download["hash"], download["probe"])
+                                      for link, download in zip(pictures_links, downloads)
+                                      if "hash" in download and not download.get("stored")})
+        # the pictures fetched are kept with the manifest, the next attempt fetches the missing ones
+        failed_downloads = [download for download in downloads if download["status"] == "exception"]
+        if failed_downloads:
+            # the pictures kept in memory are written to their staging path only now, as the chapter is not complete
+            for index, download in enumerate(downloads):
+                if not download.get("resumed") and manifest.get_page(index) is None:
+                    self._record_page(manifest, index, download)
+            raise failed_downloads[0]["exception"]
+
+        for link, download in zip(pictures_links, downloads):
             img_number = str(counter).zfill(zfill_required)
             if full_logs:
-                kao_utils.log(self.loggers, "[Info][{platform}][Chapter][Image] {which_image}/{total_pictures}: {link}"
-                              .format(platform=self.platform, which_image=img_number, total_pictures=total_pictures,
-                                      link=link))
-
-            img_response = self.scraper.get(link, headers=headers, cookies=self.cookies)
-            img_content = img_response.content
-            # check img_content is OK because some sites return 200 even if the img is a fake img
-            # Example: when Scantrad put on their site images from Webtoons, the last img of the chapter is a fake img
-            # with an "OK" content
-            if img_response.status_code != 200:
+                logger_utils.log(self.loggers,
+                                 "[Info][{platform}][Chapter][Image] {which_image}/{total_pictures}: {link}"
+                                 .format(platform=self.platform, which_image=img_number, total_pictures=total_pictures,
+                                         link=link))
+
+            if download["status"] == "error":
+                if full_logs:
+                    logger_utils.log(self.loggers, "[Error][{}][Chapter] Error while downloading picture '{}'"
+                                     .format(self.platform, link))
+                continue
+            if download["status"] == "fake":
                 if full_logs:
-                    kao_utils.log(self.loggers, "[Error][{}][Chapter] Error while downloading picture '{}'"
-                                  .format(self.platform, link))
+                    logger_utils.log(self.loggers,
+                                     "[Warning][{}][chapter] Image '{}' is a fake img, content: \"{}\"".format(
+                                         self.platform, link, download["content"]))
                 continue
-            if img_content == b'OK' or b'Bad Request' in img_content:
+            if download["status"] == "skipped":
                 if full_logs:
-                    kao_utils.log(self.loggers,
-                                  "[Warning][{}][chapter] Image '{}' is a fake img, content: \"{}\"".format(
-                                      self.platform, link, img_content))
+                    logger_utils.log(self.loggers, "[Info][{}][Chapter][Download] Image {} from {} is too small"
+                                     .format(self.platform, counter, os.path.basename(chapter_path)))
+                continue
+            if download["status"] == "blocked":
+                if full_logs:
+                    logger_utils.log(self.loggers, "[Info][{}][Chapter][Download] Image '{}' is in the blocklist"
+                                     .format(self.platform, link))
+                continue
+            if download["status"] == "junk":
+                if full_logs:
+                    logger_utils.log(self.loggers, "[Info][{}][Chapter][Download] Image '{}' is a known credit or ad "
+                                                   "page".format(self.platform, link))
                 continue
 
-            img_extension = downloader_utils.get_img_extension(img_content)
+            # format, size and mode were read from a single parse of the image header
+            img_probe = download["probe"]
+            img_extension = img_probe.format
             img_path = path.join(chapter_path, img_number + "." + img_extension)
+            # pictures are saved as downloaded, the ones that can not be embedded in a PDF as is are converted when
+            # building the PDF
             try:
-                img_is_too_large_or_small = downloader_utils.img_is_too_small(
-                    img_content) or downloader_utils.img_is_too_large(img_content)
-
-                if img_is_too_large_or_small:
-                    if full_logs:
-                        kao_utils.log(self.loggers, "[Info][{}][Chapter][Download] Image {} from {} is too small"
-                                      .format(self.platform, counter, os.path.basename(chapter_path)))
-                    continue
-                if downloader_utils.img_has_alpha_channel(img_content) and img_extension.lower() != "png":
-                    kao_utils.log(self.loggers, "[Info][{}][Chapter][Download] Image {}"
-                                  .format(self.platform, img_path))
-                    # save image file after removing alpha channel
-                    downloader_utils.force_image_rgb(img_content=img_content, img_path=img_path)
+                if "data" in download:
+                    pictures.append((path.basename(img_path), download["data"]))
                 else:
-                    # save image file
-                    with open(img_path, "wb") as f:
-                        f.write(img_content)
+                    # all the pictures are fetched, move them in place
+                    os.replace(download["path"], img_path)
+                    pictures.append(img_path)
 
             except Exception as e:
-                kao_utils.log(self.loggers, "[Error][{}][Chapter][Download] message: {}".format(self.platform, e))
+                logger_utils.log(self.loggers, "[Error][{}][Chapter][Download] message: {}".format(self.platform, e))
                 corrupted_img_path = os.path.join(Path(__file__).parent.parent, 'corrupted_picture.jpg')
                 img = Image.open(corrupted_img_path)
                 img.save(img_path)  # save the corrupted image
+                pictures.append(img_path)
             counter += 1
 
-    def _get_page_content(self, link: str) -> tuple[BeautifulSoup, etree._Element]:
+        manifest.remove()
+        return pictures
+
+    def _request(self, method: str, link: str, headers: dict, data: Optional[dict] = None, **kwargs):
+        """
+        Send a request to the website or to its pictures server, at the rate of its host (see
+        DownloaderRegistry.register)
+        :param method: str - HTTP method
+        :param link: str - requested link
+        :param headers: dict - headers to use for the request
+        :param data: Optional[dict] - body of the request
+        :param kwargs: other arguments of Transport.request (ex: stream)
+        :return: requests.Response - the response
+        """
+        return self.transport.request(method, link, headers=headers, data=data, cookies=self.cookies, **kwargs)
+
+    def _fetch_page(self, link: str, method: str = "GET", cache_ttl: Optional[int] = None, headers: dict = None,
+                    data: dict = None) -> bytes:
+        """
+        Request a page, through the HTTP cache when cache_ttl is given
+        A cached page younger than cache_ttl is used as is, an older one is revalidated with a conditional request
+        (If-None-Match / If-Modified-Since) and used again when the website answers 304 Not Modified
+        :param link: str - link of the page
+        :param method: str - HTTP method
+        :param cache_ttl: Optional[int] - seconds during which the cached page is fresh, None to bypass the cache
+        :param headers: dict - headers to use for the request
+        :param data: dict - body of the request
+        :return: bytes - content of the page
+        """
+        headers = dict(headers) if headers is not None else {}
+        if cache_ttl is None:
+            return self._request(method, link, headers, data).content
+
+        key = HttpCache.get_key(method, link, data)
+        entry = self.http_cache.get(key)
+        if entry is not None:
+            if time.time() - entry["stored_at"] < cache_ttl:
+                return entry["content"]
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+
+        response = self._request(method, link, headers, data)
+        if response.status_code == 304 and entry is not None:
+            self.http_cache.refresh(key)
+            return entry["content"]
+        if response.status_code == 200:
+            self.http_cache.set(key, response.content, response.headers.get('ETag'),
+                                response.headers.get('Last-Modified'))
+        return response.content
+
+    def _get_page_content(self, link: str, cache_ttl: Optional[int] = None) -> tuple[HtmlNode, etree._Element]:
         """
         get the html content of the page
+        The page is parsed once by lxml, the HtmlNode wraps the same tree for the find / select queries
         :param link: str - link of the page
-        :return: tuple[BeautifulSoup, etree._Element] - (html content, xml content)
+        :param cache_ttl: Optional[int] - seconds during which the cached page is fresh, None to bypass the cache
+        :return: tuple[HtmlNode, etree._Element] - (html content, xml content)
         """
-        response = self.scraper.get(link, cookies=self.cookies)
-        soup = BeautifulSoup(response.content, "html.parser")
-        dom = etree.HTML(str(soup))
-        return soup, dom
+        content = self._fetch_page(link, cache_ttl=cache_ttl)
+        soup = HtmlNode.parse(content)
+        return soup, soup.element
 
     def create_series(self, link: str) -> Series:
         """
@@ -222,13 +531,15 @@ class Downloader:
         raise NotImplementedError
 
     def download_series(self, series: Series, force_re_dl: bool = False, keep_img: bool = False,
-                        full_logs: bool = False) -> Series:
+                        full_logs: bool = False,
+                        on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
         """
         Download the series from the link
         :param series: Series - series object to download
         :param force_re_dl: bool - True to force the re-download of the series
         :param keep_img: bool - True to keep the images after the download on the chapter folder
         :param full_logs: bool - True to display full logs
+        :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called with each chapter once downloaded
         :return: Series - the downloaded series
         """
         raise "Not Implemented"
@@ -242,54 +553,127 @@ class Downloader:
         :return: Series - the generated series
         """
         if full_logs:
-            kao_utils.log(self.loggers, "[Info][{}][Series] Creating object".format(self.platform))
+            logger_utils.log(self.loggers, "[Info][{}][Series] Creating object".format(self.platform))
 
         series = Series(series_title, link)
         series.set_platform(self.platform)
 
         if full_logs:
-            kao_utils.log(self.loggers, "[Info][{}][series] Getting chapters' links from '{}'"
-                          .format(self.platform, series.get_name()))
+            logger_utils.log(self.loggers, "[Info][{}][series] Getting chapters' links from '{}'"
+                             .format(self.platform, series.get_name()))
 
         return series
 
     def _download_chapters_from_series(self, series: Series, force_re_dl: bool = False,
-                                       keep_img: bool = False, full_logs: bool = False) -> Series:
+                                       keep_img: bool = False, full_logs: bool = False,
+                                       on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Series:
         """
         Download all chapters from the series object
         :param series: Series - series to download
         :param force_re_dl: bool - True to force the re-download of the series
         :param keep_img: bool - True to keep the images after the download on the chapter folder
         :param full_logs: bool - True to display full logs
+        :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called with each chapter once downloaded
         :return: Series - the downloaded series
         """
-        retry_download = 0
         total_chapters = len(series.get_all_chapter_links())
-        retry = True
-        kao_utils.log(self.loggers, "[Info][{}][Series] Start downloading {} chaps from '{}'"
-                      .format(self.platform, total_chapters, series.name))
-        for index in range(0, total_chapters):
-            while retry:
-                try:
-                    kao_utils.log(self.loggers, "[Info][{}][Series] Get Chapter {} / {}\t(retry {})"
-                                  .format(self.platform, index + 1, total_chapters, retry_download))
-                    if retry_download > 3:
-                        retry_download = 0
-                        kao_utils.log(self.loggers, "[Error][{}][Series][Download] '{}' : {}"
-                                      .format(self.platform, series.name, series.get_chapter_link(index)))
-                        retry = False
-                        continue
-
-                    chapter = self.download_chapter(series.get_chapter_link(index), force_re_dl, keep_img, full_logs)
-                    series.add_chapter(chapter)
-                    retry = False
-                except Exception as e:
-                    retry_download += 1
-                    kao_utils.log(self.loggers, "[Error][{}][Series][Download][Exception] '{}' : {}"
-                                  .format(self.platform, series.get_chapter_link(index), e))
-            retry = True
+        fingerprint, known_links = self._get_series_known_links(series, force_re_dl)
+        indexes = [index for index, link in enumerate(series.get_all_chapter_links())
+                   if downloader_utils.canonical_link(link) not in known_links]
+        logger_utils.log(self.loggers, "[Info][{}][Series] Start downloading {} chaps from '{}' ({} new)"
+                         .format(self.platform, total_chapters, series.name, len(indexes)))
+        self._submit_known_chapters(series, known_links, on_chapter_downloaded)
+        for index in indexes:
+            chapter = self._download_chapter_with_retries(series, index, force_re_dl, keep_img, full_logs)
+            if chapter is not None:
+                series.add_chapter(chapter)
+                known_links.add(downloader_utils.canonical_link(series.get_chapter_link(index)))
+                if on_chapter_downloaded is not None:
+                    on_chapter_downloaded(chapter)
+
+        self._save_series_known_links(series, fingerprint, known_links)
         return series
 
+    def _get_series_known_links(self, series: Series, force_re_dl: bool = False) -> tuple[str, set[str]]:
+        """
+        Compare the chapters list of the series with its manifest
+        :param series: Series - series with its fresh chapters list
+        :param force_re_dl: bool - True to ignore the manifest
+        :return: tuple[str, set[str]] - fingerprint of the chapters list, canonical links already handled
+        """
+        fingerprint = downloader_utils.get_links_fingerprint(series.get_all_chapter_links())
+        manifest = None if force_re_dl else self.ledger.get_series_manifest(series.series_link)
+        if manifest is None:
+            return fingerprint, set()
+
+        manifest_fingerprint, known_links = manifest
+        if manifest_fingerprint == fingerprint:
+            logger_utils.log(self.loggers, "[Info][{}][Series] '{}': no new chapter".format(self.platform, series.name))
+            return fingerprint, set(map(downloader_utils.canonical_link, series.get_all_chapter_links()))
+
+        return fingerprint, known_links
+
+    def _submit_known_chapters(self, series: Series, known_links: set[str],
+                               on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> None:
+        """
+        Give the chapters of the series already downloaded to on_chapter_downloaded, without requesting the website
+        So a file asked for the first time (ex: -e pdf after a run without -e) is still built for these chapters, the
+        assembly skips the chapters whose file already exists
+        :param series: Series - series of the chapters
+        :param known_links: set[str] - canonical links of the chapters handled
+        :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called with each downloaded chapter
+        :return: None
+        """
+        if on_chapter_downloaded is None:
+            return
+        for link in series.get_all_chapter_links():
+            if downloader_utils.canonical_link(link) not in known_links:
+                continue
+            names = self.ledger.get_chapter_by_link(link)
+            if names is not None:
+                on_chapter_downloaded(Chapter(names[0], names[1], self.platform))
+
+    def _save_series_known_links(self, series: Series, fingerprint: str, known_links: set[str]) -> None:
+        """
+        Save the manifest of the series, its fingerprint is saved only when all chapters are handled so a listing
+        with failed chapters is compared again next time
+        :param series: Series - downloaded series
+        :param fingerprint: str - fingerprint of the chapters list
+        :param known_links: set[str] - canonical links of the chapters handled
+        :return: None
+        """
+        all_known = all(downloader_utils.canonical_link(link) in known_links
+                        for link in series.get_all_chapter_links())
+        self.ledger.set_series_manifest(series.series_link, fingerprint if all_known else None, known_links)
+
+    def _download_chapter_with_retries(self, series: Series, index: int, force_re_dl: bool = False,
+                                       keep_img: bool = False, full_logs: bool = False) -> Optional[Chapter]:
+        """
+        Download one chapter of the series, retry when the download fails
+        :param series: Series - series of the chapter
+        :param index: int - index of the chapter link in the series
+        :param force_re_dl: bool - True to force the re-download of the chapter
+        :param keep_img: bool - True to keep the images after the download on the chapter folder
+        :param full_logs: bool - True to display full logs
+        :return: Optional[Chapter] - the downloaded chapter, None when all retries failed
+        """
+        retry_download = 0
+        total_chapters = len(series.get_all_chapter_links())
+        while True:
+            try:
+                logger_utils.log(self.loggers, "[Info][{}][Series] Get Chapter {} / {}\t(retry {})"
+                                 .format(self.platform, index + 1, total_chapters, retry_download))
+                if retry_download > 3:
+                    logger_utils.log(self.loggers, "[Error][{}][Series][Download] '{}' : {}"
+                                     .format(self.platform, series.name, series.get_chapter_link(index)))
+                    return None
+
+                return self.download_chapter(series.get_chapter_link(index), force_re_dl, keep_img, full_logs)
+            except Exception as e:
+                retry_download += 1
+                logger_utils.log(self.loggers, "[Error][{}][Series][Download][Exception] '{}' : {}"
+                                 .format(self.platform, series.get_chapter_link(index), e))
+
     def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
                          full_logs: bool = False) -> Chapter:
         """
@@ -315,7 +699,8 @@ class Downloader:
         return downloader_utils.clear_white_characters(new_name.strip())
 
     def _download_chapter_files(self, dom: etree._Element, series_title: str, series_chapter: str, referer: str,
-                                force_re_dl: bool = False, keep_img: bool = False, full_logs: bool = False) -> Chapter:
+                                force_re_dl: bool = False, keep_img: bool = False, full_logs: bool = False,
+                                link: Optional[str] = None) -> Chapter:
         """
         Download all the images from the chapter
         :param dom: etree._Element - xml content of the chapter webpage
@@ -325,12 +710,13 @@ class Downloader:
         :param force_re_dl: bool - True to force the re-download of the series
         :param keep_img: bool - True to keep the images after the download on the chapter folder
         :param full_logs: bool - True to display full logs
+        :param link: Optional[str] - link of the chapter, recorded to skip the chapter webpage next time
         :return: Chapter - the downloaded chapter
         """
         series_name = self._clear_name(series_title)
         chapter_name = self._clear_name(series_chapter)
-        kao_utils.log(self.loggers, "[Info][{platform}][Chapter][Download] {series} - {chapter}"
-                      .format(platform=self.platform, series=series_name, chapter=chapter_name))
+        logger_utils.log(self.loggers, "[Info][{platform}][Chapter][Download] {series} - {chapter}"
+                         .format(platform=self.platform, series=series_name, chapter=chapter_name))
 
         series_path = path.join(self.base_dir, series_name)
         chapter_path = path.join(series_path, chapter_name)
@@ -338,27 +724,31 @@ class Downloader:
         chapter = Chapter(series_name, chapter_name, self.platform)
 
         if self._is_chapter_already_downloaded(series_path, chapter.name) and not force_re_dl:
-            kao_utils.log(self.loggers, "[Info][{}][Chapter] Chapter '{}' from '{}' is already downloaded"
-                          .format(self.platform, chapter.get_name(), series_name))
+            logger_utils.log(self.loggers, "[Info][{}][Chapter] Chapter '{}' from '{}' is already downloaded"
+                             .format(self.platform, chapter.get_name(), series_name))
+            if link is not None:
+                self.ledger.set_chapter_link(series_name, chapter.get_name(), link)
             return chapter
 
         try:
             self._create_skeleton(chapter_path)
         except Exception as e:
-            kao_utils.log(self.loggers, "[Error][{}][Chapter] Error when creating the chapter skeleton: {}"
-                          .format(self.platform, e))
+            logger_utils.log(self.loggers, "[Error][{}][Chapter] Error when creating the chapter skeleton: {}"
+                             .format(self.platform, e))
             raise "Error when creating the chapter skeleton"
 
-        kao_utils.log(self.loggers, "[Info][{}][Chapter] Downloading pictures...".format(self.platform))
+        logger_utils.log(self.loggers, "[Info][{}][Chapter] Downloading pictures...".format(self.platform))
 
         pictures_links = self.extract_pictures_links_from_webpage(dom)
 
-        self._download_pictures(chapter_path, pictures_links, referer, full_logs)
+        pictures = self._download_pictures(chapter_path, pictures_links, referer, full_logs, keep_img)
 
-        self._add_chapter_to_downloaded_chapters(series_path, chapter.get_name())
-        kao_utils.log(self.loggers, "[Info][{}][Chapter] '{}': Complete".format(self.platform, chapter.get_full_name()))
+        self._add_chapter_to_downloaded_chapters(series_path, chapter.get_name(), pictures, link)
+        logger_utils.log(self.loggers, "[Info][{}][Chapter] '{}': Complete"
+                         .format(self.platform, chapter.get_full_name()))
 
         if keep_img is False:
-            self._clear_images(chapter_path)
+            # the chapter file is created from these pictures, then they are removed (see kao_utils.concat_chapter_to)
+            chapter.set_images(pictures)
 
         return chapter
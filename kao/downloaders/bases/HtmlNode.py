@@ -0,0 +1,115 @@
+from functools import lru_cache
+from typing import Optional
+
+from lxml import etree
+from lxml.cssselect import CSSSelector
+
+# text of an element like BeautifulSoup .text: without comments, scripts and styles
+_text_xpath = etree.XPath("descendant::text()[not(parent::script or parent::style)]")
+
+
+@lru_cache(maxsize=None)
+def _get_find_xpath(name: str, attr_names: tuple[str, ...]) -> etree.XPath:
+    """
+    Compile the XPath of a find() query, the values of the attributes are given as the variables $v0, $v1, ... when
+    calling it, so they do not need to be escaped
+    :param name: str - tag name
+    :param attr_names: tuple[str, ...] - attributes to match, "class" matches one of the classes like bs4
+    :return: etree.XPath - compiled XPath
+    """
+    predicates = []
+    for index, attr_name in enumerate(attr_names):
+        if attr_name == "class":
+            predicates.append("contains(concat(' ', normalize-space(@class), ' '), concat(' ', $v{}, ' '))"
+                              .format(index))
+        else:
+            predicates.append("@{}=$v{}".format(attr_name, index))
+    condition = "[{}]".format(" and ".join(predicates)) if predicates else ""
+    return etree.XPath("descendant::{}{}".format(name, condition))
+
+
+@lru_cache(maxsize=None)
+def _get_css_selector(css: str) -> CSSSelector:
+    """
+    Compile a CSS selector
+    :param css: str - CSS selector
+    :return: CSSSelector - compiled selector
+    """
+    return CSSSelector(css, translator="html")
+
+
+class HtmlNode:
+    """
+    Thin adapter over a lxml element offering the BeautifulSoup methods used by the downloaders (find, find_all,
+    select, select_one, text, attrs), so a page is parsed only once by lxml
+    """
+
+    def __init__(self, element: etree._Element):
+        self.element = element
+
+    @classmethod
+    def parse(cls, content: bytes) -> "HtmlNode":
+        """
+        Parse a html page
+        :param content: bytes - content of the page
+        :return: HtmlNode - root of the page
+        """
+        try:
+            # decode utf-8 pages ourselves: lxml falls back to latin-1 when the page does not declare its charset
+            dom = etree.HTML(content.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            dom = etree.HTML(content)
+        if dom is None:
+            # lxml gives no tree for an empty (or blank) page
+            raise ValueError("The page is empty")
+        return cls(dom)
+
+    @property
+    def text(self) -> str:
+        return "".join(_text_xpath(self.element))
+
+    @property
+    def attrs(self) -> dict[str, str]:
+        return dict(self.element.attrib)
+
+    def get(self, attr_name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.element.get(attr_name, default)
+
+    def find_all(self, name: str, attrs: dict[str, str] = None) -> list["HtmlNode"]:
+        """
+        Find all descendants with the tag name and the attributes
+        :param name: str - tag name
+        :param attrs: dict[str, str] - attributes to match
+        :return: list[HtmlNode] - found elements
+        """
+        attrs = sorted((attrs or {}).items())
+        xpath = _get_find_xpath(name, tuple(attr_name for attr_name, _ in attrs))
+        variables = {"v{}".format(index): value for index, (_, value) in enumerate(attrs)}
+        return [HtmlNode(element) for element in xpath(self.element, **variables)]
+
+    def find(self, name: str, attrs: dict[str, str] = None) -> Optional["HtmlNode"]:
+        """
+        Find the first descendant with the tag name and the attributes
+        :param name: str - tag name
+        :param attrs: dict[str, str] - attributes to match
+        :return: Optional[HtmlNode] - found element, None if there is no match
+        """
+        elements = self.find_all(name, attrs)
+        return elements[0] if elements else None
+
+    def select(self, css: str) -> list["HtmlNode"]:
+        """
+        Find all descendants matching the CSS selector
+        :param css: str - CSS selector
+        :return: list[HtmlNode] - found elements
+        """
+        return [HtmlNode(element) for element in _get_css_selector(css)(self.element)]
+
+    def select_one(self, css: str) -> Optional["HtmlNode"]:
+        """
+        Find the first descendant matching the CSS selector
+        :param css: str - CSS selector
+        :return: Optional[HtmlNode] - found element, None if there is no match
+        """
+        elements = self.select(css)
+        return elements[0] if elements else None
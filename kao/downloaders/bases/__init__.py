@@ -1,3 +1,5 @@
 from .Series import Series
 from .Chapter import Chapter
+from .HtmlNode import HtmlNode
 from .Downloader import Downloader
+from .AsyncDownloader import AsyncDownloader
@@ -1,9 +1,13 @@
+import hashlib
 import imghdr
+import io
 import mimetypes
 import os
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional, Union
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
+import numpy as np
 from PIL import ImageFile, Image
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -58,15 +62,82 @@ def folder_contains_files(list_of_path: list[str]) -> bool:
     return False
 
 
+class ImageProbe(NamedTuple):
+    """
+    Format, dimensions and mode of an image, read from its header only
+    """
+    format: str
+    width: int
+    height: int
+    mode: str
+
+    def get_size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def is_too_small(self, min_height: int = 10, min_width: int = 10) -> bool:
+        """
+        Check if the image is too small
+        :param min_height: int - The minimum height of the image
+        :param min_width: int - The minimum width of the image
+        :return: bool - True if the image is too small, False otherwise
+        """
+        return self.height < min_height or self.width < min_width
+
+    def is_too_large(self, max_height: int = 144000, max_width: int = 144000) -> bool:
+        """
+        Check if the image is too large
+        :param max_height: int - The maximum height of the image
+        :param max_width: int - The maximum width of the image
+        :return: bool - True if the image is too large, False otherwise
+        """
+        return self.height > max_height or self.width > max_width
+
+    def has_alpha_channel(self) -> bool:
+        """
+        Check if the image has an alpha channel
+        :return: bool - True if the image has an alpha channel, False otherwise
+        """
+        return self.mode == 'RGBA'
+
+
+def probe_image(img_content: bytes, header_size: int = 4096) -> ImageProbe:
+    """
+    Read format, dimensions and mode of an image in a single parse of its header
+    Only the first bytes are parsed, the header is enlarged until Pillow can identify the image
+    :param img_content: bytes - The image content
+    :param header_size: int - The number of bytes parsed first
+    :return: ImageProbe - The information of the image
+    """
+    while True:
+        try:
+            # Image.open is lazy: it reads the header without decoding (nor allocating) the pixels
+            with Image.open(io.BytesIO(img_content[:header_size])) as img:
+                return ImageProbe(img.format, img.width, img.height, img.mode)
+        except Image.DecompressionBombError:
+            raise
+        except Exception:
+            if header_size >= len(img_content):
+                raise
+            header_size *= 4
+
+
+def probe_image_file(img_path: str) -> ImageProbe:
+    """
+    Read format, dimensions and mode of an image file, only its header is read from the disk
+    :param img_path: str - The path to the image
+    :return: ImageProbe - The information of the image
+    """
+    with Image.open(img_path) as img:
+        return ImageProbe(img.format, img.width, img.height, img.mode)
+
+
 def get_img_size(img_content: bytes) -> tuple[int, int]:
     """
     Get the size of an image
     :param img_content: bytes - The image content
     :return: tuple[int, int] - The size of the image
     """
-    img_parser = ImageFile.Parser()
-    img_parser.feed(img_content)
-    return img_parser.image.size
+    return probe_image(img_content).get_size()
 
 
 def img_is_too_small(img_content: bytes, min_height: int = 10, min_width: int = 10) -> bool:
@@ -77,8 +148,7 @@ def img_is_too_small(img_content: bytes, min_height: int = 10, min_width: int =
     :param min_width: int - The minimum width of the image
     :return: bool - True if the image is too small, False otherwise
     """
-    width, height = get_img_size(img_content)
-    return height < min_height or width < min_width
+    return probe_image(img_content).is_too_small(min_height, min_width)
 
 
 def img_is_too_large(img_content: bytes, max_height: int = 144000, max_width: int = 144000) -> bool:
@@ -89,8 +159,7 @@ def img_is_too_large(img_content: bytes, max_height: int = 144000, max_width: in
     :param max_width: int - The maximum width of the image
     :return: bool - True if the image is too large, False otherwise
     """
-    width, height = get_img_size(img_content)
-    return height > max_height or width > max_width
+    return probe_image(img_content).is_too_large(max_height, max_width)
 
 
 def img_has_alpha_channel(img_content: bytes) -> bool:
@@ -99,50 +168,79 @@ def img_has_alpha_channel(img_content: bytes) -> bool:
     :param img_content: bytes - The image content
     :return: bool - True if the image has an alpha channel, False otherwise
     """
-    img_parser = ImageFile.Parser()
-    img_parser.feed(img_content)
-    return img_parser.image.mode == 'RGBA'
+    return probe_image(img_content).has_alpha_channel()
 
 
-def force_image_rgb(img_path: str, img_content: Optional[str] = None) -> None:
+def force_image_rgb(img_path: str, img_content: Optional[bytes] = None) -> None:
     """
     Force an image to be RGB (remove alpha channel)
     :param img_path: str - The path to the image
-    :param img_content: Optional[str] - The image content
+    :param img_content: Optional[bytes] - The image content, read from img_path when not given
     :return: None
     """
-    if img_content is not None and get_img_extension(img_content) == 'png':
-        return
-    if get_img_extension(open(img_path, 'rb').read()) == 'png':
-        return
-
-    img = Image.open(img_path if img_content is None else img_content)
+    img = Image.open(img_path if img_content is None else io.BytesIO(img_content))
     rgb_img = img.convert('RGB')
     rgb_img.save(img_path)
 
 
+def convert_image_to_png(image: Union[str, bytes]) -> bytes:
+    """
+    Convert an image to a lossless gray or RGB PNG image (remove alpha channel and palette)
+    :param image: Union[str, bytes] - The path or the content of the image
+    :return: bytes - The content of the PNG image
+    """
+    with Image.open(image if isinstance(image, str) else io.BytesIO(image)) as img:
+        if img.mode.startswith('I') or img.mode == 'F':
+            converted_img = convert_image_to_8_bits(img)
+        else:
+            converted_img = img.convert('L' if img.mode in ('1', 'L', 'LA') else 'RGB')
+    output = io.BytesIO()
+    converted_img.save(output, format='PNG')
+    return output.getvalue()
+
+
+def convert_image_to_8_bits(img: Image.Image) -> Image.Image:
+    """
+    Convert a 16 bits or 32 bits gray image (I;16, I, F modes) to an 8 bits gray image, the values are scaled down
+    instead of being clipped to 255 (Image.convert('L') makes a 16 bits page almost white)
+    :param img: Image.Image - The gray image
+    :return: Image.Image - The 8 bits gray image
+    """
+    pixels = np.asarray(img)
+    max_value = float(pixels.max()) if pixels.size else 0.0
+    if pixels.dtype.kind == 'f':
+        # float images are usually in [0, 1]
+        scale = 255.0 if max_value <= 1.0 else 255.0 / max_value
+    elif max_value <= 255:
+        scale = 1.0
+    elif max_value <= 65535:
+        scale = 1.0 / 256
+    else:
+        scale = 255.0 / max_value
+    return Image.fromarray(np.clip(pixels.astype(np.float64) * scale, 0, 255).astype(np.uint8))
+
+
 def get_img_extension(img_content) -> str:
     """
     Get the extension of an image
     :param img_content: bytes - The image content
     :return: str - The extension of the image (Capitalized)
     """
-    img_parser = ImageFile.Parser()
-    img_parser.feed(img_content)
-    return img_parser.image.format
+    return probe_image(img_content).format
 
 
-def keep_only_images_paths(images_list: list[str]) -> list[str]:
+def keep_only_images_paths(images_list: list[str], metadata_cache=None) -> list[str]:
     """
     Keep only images paths in a list of paths
     :param images_list: list[str] - The list of paths
+    :param metadata_cache: Optional[ImageMetadataCache] - metadata of the images of the folder, the images already
+     scanned (and unchanged since) are not opened again
     :return: list[str] - The list of images paths
     """
     images = list(filter(lambda elem: not os.path.isdir(elem), images_list))
-    images = list(filter(lambda elem: test_is_image(elem), images))
-    # When is personal folder, we need to ensure that all images are images
-    for img in images:
-        force_image_rgb(img)
+    is_image = metadata_cache.is_image if metadata_cache is not None else test_is_image
+    # images are not rewritten: the ones that can not be embedded as is are converted when building the PDF
+    images = list(filter(lambda elem: is_image(elem), images))
 
     return images
 
@@ -189,10 +287,49 @@ def find_all_sub_folders(folder_path: str) -> list[str]:
                 dir_path = str(Path(file_path).parent.absolute())
                 if dir_path not in sub_folders:
                     sub_folders.append(dir_path)
+                # one image is enough to keep the folder
+                break
 
     return sub_folders
 
 
+def canonical_link(link: str) -> str:
+    """
+    Get the canonical form of a link: without white characters around, the display parameter
+    "style" of the Madara websites (?style=list) and the trailing slash
+    :param link: str - The link to clean
+    :return: str - canonical link
+    """
+    scheme, netloc, link_path, query, fragment = urlsplit(link.strip())
+    query = urlencode([(key, value) for key, value in parse_qsl(query, keep_blank_values=True) if key != "style"])
+    if link_path != "/":
+        link_path = link_path.rstrip("/")
+
+    return urlunsplit((scheme, netloc.lower(), link_path, query, ""))
+
+
+def get_link_host(link: str) -> Optional[str]:
+    """
+    Get the host of a web link, without "www."
+    :param link: str - The link
+    :return: Optional[str] - host of the link in lower case, None if the link is not a http(s) link (local path)
+    """
+    parts = urlsplit(link.strip())
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def get_links_fingerprint(links: list[str]) -> str:
+    """
+    Get a fingerprint of a list of links, used to know if the chapters list of a series has changed
+    :param links: list[str] - The list of links
+    :return: str - sha1 of the canonical links
+    """
+    return hashlib.sha1("\n".join(canonical_link(link) for link in links).encode("utf-8")).hexdigest()
+
+
 def clear_white_characters(text: str) -> str:
     """
     Clear white characters in a string
@@ -208,4 +345,4 @@ def test_is_image(file_path: str) -> bool:
     :param file_path: str - The path to the file
     :return: bool - True if the file is an image, False otherwise
     """
-    return imghdr.what(file_path) is not None or 'image/jpeg' == mimetypes.MimeTypes().guess_type(file_path)[0]
+    return imghdr.what(file_path) is not None or 'image/jpeg' == mimetypes.guess_type(file_path)[0]
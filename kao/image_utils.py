@@ -0,0 +1,223 @@
+import io
+from typing import Iterator, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+# maximum variance of a row considered uniform (compression noise included)
+uniform_row_variance = 25.0
+# maximum brightness range of the thumbnail of a flat image
+flat_image_range = 16
+# maximum difference between the channels of a pixel of a black and white page (compression noise included)
+grayscale_channel_spread = 24
+# reduction of the thumbnails whose colours are checked
+grayscale_thumbnail_scale = 8
+
+
+def load_image_array(img: Union[str, tuple[str, bytes]], max_width: int = 0) -> np.ndarray:
+    """
+    Decode an image as a RGB array
+    :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+    :param max_width: int - width of the array when the image is wider (0 to keep the width of the image)
+    :return: np.ndarray - pixels of the image (height, width, 3)
+    """
+    with Image.open(io.BytesIO(img[1]) if isinstance(img, tuple) else img) as image:
+        if 0 < max_width < image.width:
+            return np.asarray(downscale_image(image, max_width, "RGB"))
+        return np.asarray(image.convert("RGB"))
+
+
+def downscale_image(image: Image.Image, max_width: int, mode: str) -> Image.Image:
+    """
+    Downscale an image to a width, JPEG images are decoded directly at a reduced scale
+    :param image: Image.Image - opened image, not decoded yet
+    :param max_width: int - width of the downscaled image in pixels
+    :param mode: str - mode of the downscaled image ("RGB" or "L")
+    :return: Image.Image - downscaled image
+    """
+    height = max(1, round(image.height * max_width / image.width))
+    image.draft(mode, (max_width, height))
+    return image.convert(mode).resize((max_width, height), Image.LANCZOS, reducing_gap=3.0)
+
+
+def dhash(img: Union[str, tuple[str, bytes]], hash_size: int = 8) -> Optional[int]:
+    """
+    Compute the difference hash of an image: the brightness gradients of a thumbnail, robust to rescaling and to the
+    compression. JPEG images are decoded directly at a reduced scale, so the hash is cheap on the download path.
+    :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+    :param hash_size: int - size of the grid of gradients (hash_size * hash_size bits)
+    :return: Optional[int] - hash of the image, None for a flat image (blank page) which has no gradient to compare
+    """
+    with Image.open(io.BytesIO(img[1]) if isinstance(img, tuple) else img) as image:
+        image.draft("L", (hash_size * 4, hash_size * 4))
+        thumbnail = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    if pixels.max() - pixels.min() < flat_image_range:
+        return None
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hamming_distances(value: int, hashes: np.ndarray) -> np.ndarray:
+    """
+    Count the bits which differ between a hash and each hash of a list, all at once
+    :param value: int - 64 bits hash
+    :param hashes: np.ndarray - 64 bits hashes (uint64)
+    :return: np.ndarray - number of different bits with each hash
+    """
+    differences = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(differences.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def find_cut_row(pixels: np.ndarray, target: int, window: int) -> int:
+    """
+    Find the row where to cut a strip near the target row, preferring uniform rows (the gutters between panels)
+    The variance of every row of the window is computed at once, the most uniform row nearest the target is returned.
+    Without uniform row in the window, the strip is cut at the target row.
+    :param pixels: np.ndarray - pixels of the strip (height, width, channels)
+    :param target: int - row where the cut is wanted
+    :param window: int - rows searched before and after the target
+    :return: int - index of the row where to cut
+    """
+    start = max(1, target - window)
+    end = min(len(pixels), target + window + 1)
+    if start >= end:
+        return min(target, len(pixels))
+    rows = pixels[start:end].reshape(end - start, -1).astype(np.float32)
+    variances = rows.var(axis=1)
+    if variances.min() > uniform_row_variance:
+        return target
+    # rows as uniform as the most uniform one (up to a tolerance for the compression noise)
+    candidates = np.flatnonzero(variances <= variances.min() + 1.0)
+    return start + int(candidates[np.abs(candidates + start - target).argmin()])
+
+
+def is_grayscale(pixels: np.ndarray) -> bool:
+    """
+    Check if a colour image only holds gray levels: the channels of every pixel are almost equal
+    Large images are sampled on a grid of about 512 x 512 pixels
+    :param pixels: np.ndarray - pixels of the image (height, width, 3)
+    :return: bool - True if the image is black and white
+    """
+    step = max(1, max(pixels.shape[:2]) // 512)
+    pixels = pixels[::step, ::step]
+    spread = pixels.max(axis=2).astype(np.int16) - pixels.min(axis=2)
+    return int(spread.max()) <= grayscale_channel_spread
+
+
+def is_grayscale_image(image: Image.Image) -> bool:
+    """
+    Check if an opened colour image only holds gray levels, on a thumbnail
+    JPEG images are decoded directly at a reduced scale. The other formats (PNG...) can not be decoded at a reduced
+    scale: the image is reduced right after its decoding, so only the thumbnail is converted and compared.
+    :param image: Image.Image - opened image, a JPEG image can not be decoded at its full size afterwards
+    :return: bool - True if the image is black and white
+    """
+    thumbnail_size = (max(1, image.width // grayscale_thumbnail_scale),
+                      max(1, image.height // grayscale_thumbnail_scale))
+    image.draft("RGB", thumbnail_size)
+    thumbnail = image.convert("RGB") if image.mode == "P" else image
+    # what the draft did not reduce is reduced now
+    factor = max(1, thumbnail.width // thumbnail_size[0])
+    return is_grayscale(np.asarray(thumbnail.reduce(factor).convert("RGB")))
+
+
+def reencode_image(img: Union[str, tuple[str, bytes]], max_width: int = 0, quality: int = 90,
+                   grayscale: bool = False, grayscale_pages: bool = False) -> Optional[tuple[str, bytes, bool]]:
+    """
+    Downscale an image wider than max_width and store with a single channel a black and white page shipped as a colour
+    image, with a single encode, so a page is not degraded by successive lossy encodes
+    The downscaled images and the JPEG images are encoded as JPEG, the other gray pages as lossless PNG.
+    :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+    :param max_width: int - maximum width of the image in pixels, 0 to keep the width
+    :param quality: int - JPEG quality (1-95)
+    :param grayscale: bool - True to store the downscaled images in gray levels (e-ink screens)
+    :param grayscale_pages: bool - True to store the black and white pages with a single channel
+    :return: Optional[tuple[str, bytes, bool]] - (extension, content, True if stored in gray levels) of the encoded
+     image, None when the image is kept as is
+    """
+    def open_image() -> Image.Image:
+        return Image.open(io.BytesIO(img[1]) if isinstance(img, tuple) else img)
+
+    with open_image() as image:
+        img_format = image.format
+        downscale = 0 < max_width < image.width
+        to_gray = grayscale and downscale
+        if not to_gray and grayscale_pages and image.mode in ("RGB", "RGBA", "P") \
+                and getattr(image, "n_frames", 1) == 1:
+            to_gray = is_grayscale_image(image)
+        if not downscale and not to_gray:
+            return None
+        mode = "L" if to_gray else "RGB"
+        if img_format == "JPEG":
+            # the check of the colours decoded the JPEG image at a reduced scale
+            with open_image() as full_image:
+                page = downscale_image(full_image, max_width, mode) if downscale else full_image.convert(mode)
+        else:
+            page = downscale_image(image, max_width, mode) if downscale else image.convert(mode)
+
+    output = io.BytesIO()
+    if downscale or img_format == "JPEG":
+        page.save(output, format="JPEG", quality=quality, optimize=downscale)
+        return "JPEG", output.getvalue(), to_gray
+    page.save(output, format="PNG")
+    return "PNG", output.getvalue(), to_gray
+
+
+def encode_page(pixels: np.ndarray, quality: int, grayscale: bool = False) -> bytes:
+    """
+    Encode a page as JPEG
+    :param pixels: np.ndarray - pixels of the page (height, width, 3)
+    :param quality: int - JPEG quality (1-95)
+    :param grayscale: bool - True to encode a black and white page with a single channel
+    :return: bytes - content of the page
+    """
+    output = io.BytesIO()
+    page = Image.fromarray(pixels)
+    if grayscale and is_grayscale(pixels):
+        page = page.convert("L")
+    page.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def restitch_images(images_list: list[Union[str, tuple[str, bytes]]], page_height: int,
+                    quality: int = 90, grayscale: bool = False, max_width: int = 0) -> Iterator[tuple[str, bytes]]:
+    """
+    Concatenate the slices of a long strip chapter, then cut it again into pages of about page_height pixels
+    Pages are cut on uniform rows near page_height, so panels are not split. Only the slices of the current page are
+    decoded at the same time. A slice with another width starts a new strip.
+    The slices wider than max_width are downscaled when they are decoded, so each page is encoded once.
+    :param images_list: list[Union[str, tuple[str, bytes]]] - slices of the chapter (paths or (name, content))
+    :param page_height: int - height wanted for the pages, in pixels
+    :param quality: int - JPEG quality of the pages
+    :param grayscale: bool - True to encode the black and white pages with a single channel
+    :param max_width: int - maximum width of the pages in pixels, 0 to keep the width of the slices
+    :return: Iterator[tuple[str, bytes]] - (name, content) of the pages
+    """
+    window = max(1, page_height // 5)
+    page_number = 0
+    buffer: list[np.ndarray] = []
+    buffer_height = 0
+
+    def next_name() -> str:
+        nonlocal page_number
+        page_number += 1
+        return "{}.JPEG".format(str(page_number).zfill(4))
+
+    for img in images_list:
+        pixels = load_image_array(img, max_width)
+        if buffer and pixels.shape[1] != buffer[0].shape[1]:
+            yield next_name(), encode_page(np.concatenate(buffer), quality, grayscale)
+            buffer, buffer_height = [], 0
+        buffer.append(pixels)
+        buffer_height += pixels.shape[0]
+
+        # cut pages while the search window is complete
+        while buffer_height >= page_height + window:
+            strip = np.concatenate(buffer)
+            cut = find_cut_row(strip, page_height, window)
+            yield next_name(), encode_page(strip[:cut], quality, grayscale)
+            buffer, buffer_height = [strip[cut:]], len(strip) - cut
+
+    if buffer_height > 0:
+        yield next_name(), encode_page(np.concatenate(buffer), quality, grayscale)
@@ -1,30 +1,25 @@
 import os
-import argparse
-import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterator
+from typing import Callable, Iterator, Optional, Union
 import shutil
+from urllib.parse import urlsplit
 from zipfile import ZipFile
 
-import img2pdf
-
-from .downloaders import Downloader
-from .downloaders import PersonalDownloader
+from .downloaders import AsyncDownloader
 from .downloaders import downloader_utils
 from .downloaders import Series
 from .downloaders import Chapter
 from .loggers import Logger
-
-
-def log(loggers: list[Logger], message: str) -> None:
-    """
-    Call all loggers to log a message
-    :param loggers: list[Logger] - list of loggers
-    :param message: str - message to log
-    :return: None
-    """
-    for logger in loggers:
-        logger.log(message)
+from .loggers.logger_utils import log
+from . import image_utils
+from .parser_utils import create_parser
+from . import pipelines
+from .pipelines import AssemblyOptions
+from .registries import DownloaderRegistry
+from .storages import ChapterManifest, ImageMetadataCache
+from .writers import StreamingPdfWriter
 
 
 def move_files_from_folder(folder_path: str, destination_path: str, ext_to_move: str,
@@ -53,106 +48,60 @@ def move_files_from_folder(folder_path: str, destination_path: str, ext_to_move:
     log(loggers, '[Info] all pdf files moved')
 
 
-def create_parser() -> argparse.ArgumentParser:
-    """
-    All arguments for the program
-    :return: argparse.ArgumentParser - parser with all arguments
-    """
-    allowed_ext = ["pdf", "zip", "cbz"]
-    parser = argparse.ArgumentParser(description='Downloader of manwha or manga scans')
-
-    # hidden argument
-    parser.add_argument("--log",
-                        dest="logs",
-                        help=argparse.SUPPRESS,
-                        action="store_true",
-                        default=False)
-    parser.add_argument("-l",
-                        "--links",
-                        nargs="+",
-                        dest="links",
-                        help="Give chapters or series links (example: py __main__.py -l link1 link2) "
-                             "(example2: py __main__.py -l link1 link2 -r file -m)")
-    parser.add_argument("-k",
-                        "--keep-img",
-                        dest="keep_img",
-                        help="If you want keep all images after download (example: py __main__.py -kl link) "
-                             "(example2: py __main__.py -kl link -r file -m)",
-                        action="store_true",
-                        default=False)
-    parser.add_argument("-f",
-                        "--force",
-                        dest="force_re_dl",
-                        help="Download again the scan (example: py __main__.py -fl link) "
-                             "(example2: py __main__.py -fkl link -r file -f)",
-                        action="store_true",
-                        default=False)
-    parser.add_argument("-e",
-                        "--extension",
-                        type=str,
-                        dest="ext_file",
-                        help="define witch file do you want create after download: "
-                             "{}  (example: py __main__.py -fkl link -e pdf) ".format(", ".join(allowed_ext)),
-                        default="")
-    parser.add_argument("-m",
-                        "--move-files",
-                        dest="move_files",
-                        nargs="?",
-                        help="Move all specific files to the folder with the same extension name, dont forget to use -e"
-                             " (folder will be created if not exists at the root of the downloads folder),"
-                             " put ALWAYS at the end of command to move all pdf files"
-                             " (example: py __main__.py -fkl link -e pdf -m)"
-                             " (example2: py __main__.py -fkl link -e pdf -m ./myFolder)",
-                        default=False)
-    parser.add_argument("-r",
-                        "--Read-file",
-                        dest="read_file",
-                        nargs="?",
-                        help="Read given file to get urls, default is './list url.txt' but you can specify another "
-                             "(example: py __main__.py -fkr file) (example2: py __main__.py -fkl link -r file -m)",
-                        default=False)
-    parser.add_argument("-s",
-                        "--support",
-                        dest="support",
-                        help="Said supported websites (example: py __main__.py -s)",
-                        action="store_true",
-                        default=False)
-
-    return parser
-
-
-def get_series_and_chapters_from_links(list_downloaders: dict[str, Downloader], links: list[str],
+def get_series_and_chapters_from_links(list_downloaders: DownloaderRegistry, links: list[str],
                                        loggers: list[Logger]) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
     """
     Get a tuple of series and chapters with their platform from a list of links
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param links: list[str] - list of links to get series and chapters
     :param loggers: list[Logger] - list of loggers
     :return: tuple[list[dict[str, str]], list[dict[str, str]]] - tuple of series and chapters with their platform like
      {platform: 'myWeb', link: 'https://myWeb.example/series/...'}
     """
-    functional_links = []
     series_to_download = []
     chapters_to_download = []
-    # extract all downloaders
-    downloaders = list(list_downloaders.values())
+    links_not_available = []
+    platforms_by_host = get_platforms_by_host(list_downloaders)
+    # the downloaders without host handle the local paths
+    local_platforms = [platform for platform in list_downloaders if not list_downloaders.get_hosts(platform)]
+    queued_links = set()
 
     for link in links:
-        for downloader in downloaders:
-            if downloader.is_a_series_link(link):
-                series_to_download.append({"platform": downloader.platform, "link": link})
-                functional_links.append(link)
+        link = link.strip()
+        if not link:
+            continue
+        host = downloader_utils.get_link_host(link)
+        if host is not None:
+            # a same chapter can be written in several ways (www, trailing slash, ?style=list), it is queued once
+            link = downloader_utils.canonical_link(link)
+            link_parts = urlsplit(link)
+            key = "{}{}?{}".format(host, link_parts.path, link_parts.query)
+            candidates = platforms_by_host.get(host, [])
+        else:
+            link = os.path.normpath(link)
+            key = link
+            candidates = local_platforms
+        if key in queued_links:
+            continue
+
+        for platform in candidates:
+            # the links are checked with the patterns of the registry, the downloader is only imported and built when
+            # a link of its platform is downloaded
+            if list_downloaders.is_a_series_link(platform, link):
+                series_to_download.append({"platform": platform, "link": link})
+                queued_links.add(key)
                 break
-            elif downloader.is_a_chapter_link(link):
-                chapters_to_download.append({"platform": downloader.platform, "link": link})
-                functional_links.append(link)
+            elif list_downloaders.is_a_chapter_link(platform, link):
+                chapters_to_download.append({"platform": platform, "link": link})
+                queued_links.add(key)
                 break
+        else:
+            links_not_available.append(link)
 
-    links_not_available = set(functional_links) ^ set(links)
     if links_not_available:
-        links_not_available = list(map(lambda x: "<{}>".format(x), links_not_available))
+        links_not_available = list(map(lambda x: "<{}>".format(x), dict.fromkeys(links_not_available)))
 
-        platforms = ", ".join(x.platform for x in downloaders)
+        platforms = ", ".join(list_downloaders)
         links_to_display = "\n\t".join(link_not_available for link_not_available in links_not_available)
         log(loggers, "Invalid link(s), please give links from {platforms}\nInvalid links:\n\t{links}"
             .format(platforms=platforms, links=links_to_display))
@@ -160,10 +109,23 @@ def get_series_and_chapters_from_links(list_downloaders: dict[str, Downloader],
     return series_to_download, chapters_to_download
 
 
-def get_series_from_dict(list_downloaders: dict[str, Downloader], series_links: list[dict[str, str]]) -> list[Series]:
+def get_platforms_by_host(list_downloaders: DownloaderRegistry) -> dict[str, list[str]]:
+    """
+    Index the platforms by the hosts of their website
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
+    :return: dict[str, list[str]] - host (without "www.") -> platforms of this host
+    """
+    platforms_by_host = {}
+    for platform in list_downloaders:
+        for host in list_downloaders.get_hosts(platform):
+            platforms_by_host.setdefault(host.lower(), []).append(platform)
+    return platforms_by_host
+
+
+def get_series_from_dict(list_downloaders: DownloaderRegistry, series_links: list[dict[str, str]]) -> list[Series]:
     """
     Get a list of series from a list of series links
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param series_links: list[dict[str, str]] - list of series to get chapters
     :return: list[Series] - list of series to download
     """
@@ -176,11 +138,11 @@ def get_series_from_dict(list_downloaders: dict[str, Downloader], series_links:
     return series
 
 
-def get_all_chapters_from_series(list_downloaders: dict[str, Downloader],
+def get_all_chapters_from_series(list_downloaders: DownloaderRegistry,
                                  series_links: list[dict[str, str]]) -> list[dict[str, str]]:
     """
     Get all chapters from a list of series
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param series_links:  list[dict[str, str]] - list of series to get chapters
     :return: list[dict[str, str]] - list of chapters with their platform like
      {platform: 'myWeb', link: 'https://myWeb.example/series/...'}
@@ -195,12 +157,42 @@ def get_all_chapters_from_series(list_downloaders: dict[str, Downloader],
     return chapters_to_download
 
 
-def download(list_downloaders: dict[str, Downloader], series: list[Series], chapters: list[dict[str, str]],
+def download(list_downloaders: DownloaderRegistry, series: list[Series], chapters: list[dict[str, str]],
              loggers: list[Logger], ext_file: str, force_re_dl: bool, keep_img: bool, full_logs: bool = False,
-             time_to_sleep: int = 0) -> None:
+             options: Optional[AssemblyOptions] = None) -> None:
     """
     Download all chapters from a list of series and all chapters from a list of chapters
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    The requests of the pages and of the pictures are rate limited per host by the transport of the downloaders (see
+    DownloaderRegistry.register)
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
+    :param series: list[Series] - list of series to download
+    :param chapters: list[dict[str, str]] - list of dictionary with platform and link of chapters to download
+    :param loggers: list[Logger] - list of loggers
+    :param ext_file: str - file extension to create
+    :param force_re_dl: bool - if True, download again the scan
+    :param keep_img: bool - if True, keep all images after download
+    :param full_logs: bool - if True, display all logs
+    :param options: Optional[AssemblyOptions] - options of the creation of the files
+    :return: None
+    """
+    # chapters are built by the pipeline workers while the next ones are downloading
+    with pipelines.AssemblyPipeline(list_downloaders, loggers, ext_file, force_re_dl, options=options) as pipeline:
+        for s in download_series(list_downloaders, series, force_re_dl, keep_img, full_logs,
+                                 lambda c: pipeline.submit(c, full_logs)):
+            log(loggers, "[Info][{}][Chapter] '{}': all chapters sent to {} creation".format(s.platform, s.name,
+                                                                                           ext_file))
+
+        for c in download_chapters(list_downloaders, chapters, force_re_dl, keep_img, full_logs):
+            # full_logs = True because we want to see the logs of the chapters
+            pipeline.submit(c, True)
+
+
+def download_async(list_downloaders: DownloaderRegistry, series: list[Series], chapters: list[dict[str, str]],
+                   loggers: list[Logger], ext_file: str, force_re_dl: bool, keep_img: bool, full_logs: bool = False,
+                   max_workers: int = 64, options: Optional[AssemblyOptions] = None) -> None:
+    """
+    Same as download() but all series and chapters are downloaded concurrently with the asyncio engine
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param series: list[Series] - list of series to download
     :param chapters: list[dict[str, str]] - list of dictionary with platform and link of chapters to download
     :param loggers: list[Logger] - list of loggers
@@ -208,45 +200,77 @@ def download(list_downloaders: dict[str, Downloader], series: list[Series], chap
     :param force_re_dl: bool - if True, download again the scan
     :param keep_img: bool - if True, keep all images after download
     :param full_logs: bool - if True, display all logs
-    :param time_to_sleep: int - time in seconds to sleep between each download
-    :return: tuple[Iterator[Series], Iterator[Chapter]] - iterator of downloaded series and chapters
+    :param max_workers: int - number of threads running the blocking calls of the downloaders
+    :param options: Optional[AssemblyOptions] - options of the creation of the files
+    :return: None
+    """
+    asyncio.run(_download_async(list_downloaders, series, chapters, loggers, ext_file, force_re_dl, keep_img,
+                                full_logs, max_workers, options))
+
+
+async def _download_async(list_downloaders: DownloaderRegistry, series: list[Series],
+                          chapters: list[dict[str, str]], loggers: list[Logger], ext_file: str, force_re_dl: bool,
+                          keep_img: bool, full_logs: bool, max_workers: int,
+                          options: Optional[AssemblyOptions] = None) -> None:
+    """
+    Coroutine of download_async()
     """
-    for s in download_series(list_downloaders, series, force_re_dl, keep_img, full_logs):
-        log(loggers, "[Info][{}][Chapter] '{}': creating {}...".format(s.platform, s.name, ext_file))
-        for c in s.chapters:
-            concat_chapter_to(list_downloaders, c, ext_file, force_re_dl, loggers, full_logs)
-        log(loggers, "[Info][{}][Chapter] '{}': all {} created".format(s.platform, s.name, ext_file))
-        time.sleep(time_to_sleep)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_workers))
+    hosts_semaphores: dict[str, asyncio.Semaphore] = {}
+    # the engines are created for the platforms of the queued links only
+    engines: dict[str, AsyncDownloader] = {}
 
-    for c in download_chapters(list_downloaders, chapters, force_re_dl, keep_img, full_logs):
+    def get_engine(platform: str) -> AsyncDownloader:
+        if platform not in engines:
+            engines[platform] = AsyncDownloader(list_downloaders[platform], hosts_semaphores)
+        return engines[platform]
+
+    pipeline = pipelines.AssemblyPipeline(list_downloaders, loggers, ext_file, force_re_dl, options=options)
+
+    async def download_one_series(s: Series) -> None:
+        s = await get_engine(s.platform).download_series(s, force_re_dl, keep_img, full_logs,
+                                                        lambda c: pipeline.submit(c, full_logs))
+        log(loggers, "[Info][{}][Chapter] '{}': all chapters sent to {} creation".format(s.platform, s.name,
+                                                                                       ext_file))
+
+    async def download_one_chapter(chapter: dict[str, str]) -> None:
+        c = await get_engine(chapter["platform"]).download_chapter(chapter["link"], force_re_dl, keep_img, full_logs)
         # full_logs = True because we want to see the logs of the chapters
-        concat_chapter_to(list_downloaders, c, ext_file, force_re_dl, loggers, True)
-        time.sleep(time_to_sleep)
+        await asyncio.to_thread(pipeline.submit, c, True)
 
+    results = await asyncio.gather(*(download_one_series(s) for s in series),
+                                   *(download_one_chapter(c) for c in chapters), return_exceptions=True)
+    await asyncio.to_thread(pipeline.close)
+    for result in results:
+        if isinstance(result, Exception):
+            log(loggers, "[Error][Async] {}".format(result))
 
-def download_series(list_downloaders: dict[str, Downloader], series: list[Series], force_re_dl: bool,
+
+def download_series(list_downloaders: DownloaderRegistry, series: list[Series], force_re_dl: bool,
                     keep_img: bool,
-                    full_logs: bool = False) -> Iterator[Series]:
+                    full_logs: bool = False,
+                    on_chapter_downloaded: Optional[Callable[[Chapter], None]] = None) -> Iterator[Series]:
     """
     Download all chapters from a list of series
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param series: list[Series] - list of series to download
     :param force_re_dl: bool - if True, download again the scan
     :param keep_img: bool - if True, keep all images after download
     :param full_logs: bool - if True, display all logs
+    :param on_chapter_downloaded: Optional[Callable[[Chapter], None]] - called with each chapter once downloaded
     :return: Iterator[Series] - iterator of downloaded series
     """
     for s in series:
         platform = s.platform
         downloader = list_downloaders[platform]
-        yield downloader.download_series(s, force_re_dl, keep_img, full_logs)
+        yield downloader.download_series(s, force_re_dl, keep_img, full_logs, on_chapter_downloaded)
 
 
-def download_chapters(list_downloaders: dict[str, Downloader], chapters: list[dict[str, str]], force_re_dl: bool,
+def download_chapters(list_downloaders: DownloaderRegistry, chapters: list[dict[str, str]], force_re_dl: bool,
                       keep_img: bool, full_logs: bool = False) -> Iterator[Chapter]:
     """
     Download all chapters from a list of chapters with their platform
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param chapters: list[dict[str, str]] - list of dictionary with platform and link of chapters to download
     :param force_re_dl: bool - if True, download again the scan
     :param keep_img: bool - if True, keep all images after download
@@ -259,16 +283,53 @@ def download_chapters(list_downloaders: dict[str, Downloader], chapters: list[di
         yield downloader.download_chapter(chapter["link"], force_re_dl, keep_img, full_logs)
 
 
-def concat_chapter_to(list_downloaders: dict[str, Downloader], chapter: Chapter, ext_file: str, force_re_dl: bool,
-                      loggers: list[Logger], full_logs: bool) -> None:
+def concat_chapter_to(list_downloaders: DownloaderRegistry, chapter: Chapter, ext_file: str, force_re_dl: bool,
+                      loggers: list[Logger], full_logs: bool, options: Optional[AssemblyOptions] = None) -> None:
     """
     Concatenate all images of a chapter to create a specific file
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    The pictures of a chapter downloaded without keeping its images are removed once the file is created
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param chapter: Chapter - chapter to build
     :param ext_file: str - file extension to create (works only for PDF, ZIP, CBZ)
     :param force_re_dl: bool - if True, make again the action the selected action
     :param loggers: list[Logger] - list of loggers
     :param full_logs: bool - if True, display all logs
+    :param options: Optional[AssemblyOptions] - options of the creation of the file
+    :return: None
+    """
+    try:
+        chapter.set_path(get_chapter_path(get_series_path(list_downloaders, chapter), chapter))
+        build_chapter_file(chapter, ext_file, force_re_dl, loggers, full_logs, options)
+    finally:
+        release_chapter_images(chapter)
+
+
+def release_chapter_images(chapter: Chapter) -> None:
+    """
+    Remove the pictures of a chapter downloaded without keeping its images, from the memory and from the disk
+    :param chapter: Chapter - chapter to release
+    :return: None
+    """
+    images = chapter.get_images()
+    if images is None:
+        return
+    for img in images:
+        if isinstance(img, str) and os.path.exists(img):
+            os.remove(img)
+    chapter.set_images(None)
+
+
+def build_chapter_file(chapter: Chapter, ext_file: str, force_re_dl: bool, loggers: list[Logger],
+                       full_logs: bool, options: Optional[AssemblyOptions] = None) -> None:
+    """
+    Create the file of a chapter whose path is set, see concat_chapter_to()
+    Only needs the chapter, so it can run in a worker process
+    :param chapter: Chapter - chapter to build, with its path
+    :param ext_file: str - file extension to create (works only for PDF, ZIP, CBZ)
+    :param force_re_dl: bool - if True, make again the action the selected action
+    :param loggers: list[Logger] - list of loggers
+    :param full_logs: bool - if True, display all logs
+    :param options: Optional[AssemblyOptions] - options of the creation of the file
     :return: None
     """
     allowed_ext = ["pdf", "zip", "cbz"]
@@ -282,11 +343,8 @@ def concat_chapter_to(list_downloaders: dict[str, Downloader], chapter: Chapter,
                                                                          ext_file))
         return
 
-    series_path = get_series_path(list_downloaders, chapter)
-    chapter_path = get_chapter_path(series_path, chapter)
-    chapter.set_path(chapter_path)
-
-    file = os.path.join(chapter_path, "{}.{}".format(chapter.get_name(), ext_file))
+    chapter_path = chapter.get_path()
+    file = get_chapter_file_path(chapter, ext_file)
     file_already_created = os.path.exists(file)
 
     if force_re_dl and file_already_created:
@@ -299,11 +357,34 @@ def concat_chapter_to(list_downloaders: dict[str, Downloader], chapter: Chapter,
     log(loggers,
         "[Info][{}][Chapter] '{}': Creating {}".format(chapter.platform, chapter.get_full_name(), ext_file))
 
-    images = get_img_from_folder(chapter_path, loggers, full_logs)
+    # pictures kept in memory by the downloader were already validated
+    images = chapter.get_images()
+    if images is None:
+        images = get_img_from_folder(chapter_path, loggers, full_logs,
+                                     options.state_dir if options is not None else None)
     if not images:
         log(loggers, "[Error][{}][Chapter] '{}': No images found".format(chapter.platform, chapter.get_full_name()))
         return
 
+    # the pages are downscaled, converted to gray levels and restitched with a single lossy encode
+    if options is not None and options.restitch_pages():
+        slices = len(images)
+        images = list(image_utils.restitch_images(images, options.page_height, options.get_quality(),
+                                                  options.grayscale_pages or options.is_grayscale_profile(),
+                                                  options.get_max_width()))
+        log(loggers, "[Info][{}][Chapter] '{}': {} slices restitched into {} pages"
+            .format(chapter.platform, chapter.get_full_name(), slices, len(images)))
+    elif options is not None and options.reencode_images():
+        images, reencoded_images, gray_images, saved_size = reencode_images(images, options)
+        log(loggers, "[Info][{}][Chapter] '{}': {} images encoded again ({} in gray levels), {:.1f} MB saved"
+            .format(chapter.platform, chapter.get_full_name(), reencoded_images, gray_images,
+                    saved_size / (1024 * 1024)))
+
+    if ext_file.lower() == "pdf":
+        images, converted_images = transcode_images(images)
+        log(loggers, "[Info][{}][Chapter] '{}': {} images converted, {} passed through"
+            .format(chapter.platform, chapter.get_full_name(), converted_images, len(images) - converted_images))
+
     if full_logs:
         log(loggers, '[Info][{}] creating'.format(ext_file.capitalize()))
 
@@ -320,15 +401,16 @@ def concat_chapter_to(list_downloaders: dict[str, Downloader], chapter: Chapter,
         "[Info][{}][Chapter] '{}': {} completed".format(chapter.platform, chapter.get_full_name(), ext_file))
 
 
-def get_series_path(list_downloaders: dict[str, Downloader], chapter: Chapter, ) -> str:
+def get_series_path(list_downloaders: DownloaderRegistry, chapter: Chapter, ) -> str:
     """
     Get the path of the series of a chapter
-    :param list_downloaders: dict[str, Downloader] - all downloaders to use
+    :param list_downloaders: DownloaderRegistry - all downloaders to use
     :param chapter: Chapter - chapter to get the series path
     :return: str - path of the series
     """
     series_path = os.path.join(list_downloaders[chapter.platform].base_dir, chapter.series_name)
-    if list_downloaders[chapter.platform].platform == PersonalDownloader.platform:
+    # the chapters of the local folders stay in their folder
+    if not list_downloaders.get_hosts(chapter.platform):
         series_path = chapter.get_path().rsplit(os.sep, 1)[0]
     return series_path
 
@@ -343,81 +425,166 @@ def get_chapter_path(series_path: str, chapter: Chapter) -> str:
     return os.path.join(series_path, chapter.get_name())
 
 
+def get_chapter_file_path(chapter: Chapter, ext_file: str) -> str:
+    """
+    Get the path of the file of a chapter whose path is set
+    :param chapter: Chapter - chapter of the file
+    :param ext_file: str - file extension
+    :return: str - path of the file
+    """
+    return os.path.join(chapter.get_path(), "{}.{}".format(chapter.get_name(), ext_file))
+
+
 def get_img_from_folder(path: str, loggers: list[Logger],
-                        full_logs: bool = False) -> list[str]:
+                        full_logs: bool = False, state_dir: Optional[str] = None) -> list[str]:
     """
     Get all images from a folder
+    The metadata of the images are cached in the state folder, so the images of a folder scanned before are not opened
     :param path: str - path of the folder
     :param loggers: list[Logger] - list of loggers
     :param full_logs: bool - if True, display all logs
+    :param state_dir: Optional[str] - folder of the state of kao, None to scan again the images next time
     :return: list[str] - list of images
     """
     images_list = []
+    metadata_cache = None
     try:
+        metadata_cache = ImageMetadataCache(path, state_dir)
 
         for element in os.listdir(path):
-            if os.path.join(path, element) is not None:
+            # the pages of an unfinished download are not pages of the chapter yet
+            if not ChapterManifest.is_staging_file(element):
                 images_list.append(os.path.join(path, element))
         images_list.sort()
 
         img_to_remove = []
 
-        images_list = downloader_utils.keep_only_images_paths(images_list)
+        images_list = downloader_utils.keep_only_images_paths(images_list, metadata_cache)
 
         for i in range(0, len(images_list)):
-            img_is_too_large_or_small = downloader_utils.img_is_too_small(open(images_list[i], 'rb').read()) \
-                                        or downloader_utils.img_is_too_large(open(images_list[i], 'rb').read())
-
             if full_logs:
                 log(loggers, '[Info][Image] {}'.format(images_list[i]))
 
-            if img_is_too_large_or_small:
+            # an image which can not be read has no probe in the cache
+            img_probe = metadata_cache.probe(images_list[i])
+            if img_probe is None:
+                log(loggers, '[Warning][Image] Corrupted: {}'.format(images_list[i]))
+                images_list[i] = os.path.join(Path(__file__).parent, 'corrupted_picture.jpg')
+                continue
+
+            if img_probe.is_too_small() or img_probe.is_too_large():
                 img_to_remove.append(i)
                 if full_logs:
                     log(loggers,
                         '[Info][Image][Skip] Img too large or small, skipped: {}'.format(images_list[i]))
-                continue
-            if downloader_utils.test_is_image(images_list[i]) is None:
-                log(loggers, '[Warning][Image] Corrupted: {}'.format(images_list[i]))
-                images_list[i] = os.path.join(Path(__file__).parent, 'corrupted_picture.jpg')
 
-        # Remove unwanted images
-        [images_list.pop(x) for x in img_to_remove]
+        # Remove unwanted images, from the end so the indexes stay valid
+        [images_list.pop(x) for x in reversed(img_to_remove)]
     except Exception as e:
         images_list = []
         log(loggers, '[Error][Images]  {error}'.format(error=e))
     finally:
+        if metadata_cache is not None:
+            metadata_cache.save()
         return images_list
 
 
-def create_pdf(path: str, images_list: list[str]) -> None:
+def reencode_images(images_list: list[Union[str, tuple[str, bytes]]], options: AssemblyOptions,
+                    max_workers: int = 4) -> tuple[list[Union[str, tuple[str, bytes]]], int, int, int]:
+    """
+    Downscale the images wider than the screen of the profile and convert the black and white pages shipped as colour
+    images to single channel images, in memory and with a single encode, the other images are kept
+    An image is kept when its encoded version is not smaller
+    :param images_list: list[Union[str, tuple[str, bytes]]] - list of images paths or (name, content) of images
+    :param options: AssemblyOptions - profile and gray levels options
+    :param max_workers: int - number of images encoded at the same time
+    :return: tuple[list[Union[str, tuple[str, bytes]]], int, int, int] - the images, the number of encoded images, the
+     number of images stored in gray levels and the number of bytes saved
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        reencoded = list(executor.map(lambda img: _reencode_image(img, options), images_list))
+    return ([img for img, _, _ in reencoded], len([saved for _, saved, _ in reencoded if saved > 0]),
+            len([gray for _, saved, gray in reencoded if saved > 0 and gray]),
+            sum(saved for _, saved, _ in reencoded))
+
+
+def _reencode_image(img: Union[str, tuple[str, bytes]],
+                    options: AssemblyOptions) -> tuple[Union[str, tuple[str, bytes]], int, bool]:
+    """
+    Encode again an image for the profile and the gray levels options
+    :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+    :param options: AssemblyOptions - profile and gray levels options
+    :return: tuple[Union[str, tuple[str, bytes]], int, bool] - the image, the number of bytes saved, True if the image
+     is stored in gray levels
+    """
+    name, size = (img[0], len(img[1])) if isinstance(img, tuple) else (os.path.basename(img), os.path.getsize(img))
+    reencoded = image_utils.reencode_image(img, options.get_max_width(), options.get_quality(),
+                                           options.is_grayscale_profile(), options.grayscale_pages)
+    if reencoded is None or len(reencoded[1]) >= size:
+        return img, 0, False
+    extension, content, gray = reencoded
+    return (os.path.splitext(name)[0] + "." + extension, content), size - len(content), gray
+
+
+def transcode_images(images_list: list[Union[str, tuple[str, bytes]]],
+                     max_workers: int = 4) -> tuple[list[Union[str, tuple[str, bytes]]], int]:
+    """
+    Convert to lossless PNG, in memory, the images that can not be embedded as is in a PDF (alpha channel, palette,
+    WebP...), the other images are passed through byte-for-byte
+    :param images_list: list[Union[str, tuple[str, bytes]]] - list of images paths or (name, content) of images
+    :param max_workers: int - number of images converted at the same time
+    :return: tuple[list[Union[str, tuple[str, bytes]]], int] - the images to embed and the number of converted images
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        transcoded = list(executor.map(_transcode_image, images_list))
+    return [img for img, _ in transcoded], len([converted for _, converted in transcoded if converted])
+
+
+def _transcode_image(img: Union[str, tuple[str, bytes]]) -> tuple[Union[str, tuple[str, bytes]], bool]:
+    """
+    Convert an image to PNG when it can not be embedded as is in a PDF
+    :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+    :return: tuple[Union[str, tuple[str, bytes]], bool] - the image to embed, True if it has been converted
+    """
+    name, content = img if isinstance(img, tuple) else (os.path.basename(img), img)
+    if StreamingPdfWriter.can_embed(content):
+        return img, False
+    return (os.path.splitext(name)[0] + ".PNG", downloader_utils.convert_image_to_png(content)), True
+
+
+def create_pdf(path: str, images_list: list[Union[str, tuple[str, bytes]]]) -> None:
     """
     Create a PDF file from a list of images
     :param path: str - path of the PDF file
-    :param images_list: list[str] - list of images
+    :param images_list: list[Union[str, tuple[str, bytes]]] - list of images paths or (name, content) of images
     :return: None
     """
-    with open(path, 'wb') as f:
-        f.write(img2pdf.convert(images_list))
+    # pages are written one by one, JPEG images are embedded without re-encoding
+    with StreamingPdfWriter(path) as writer:
+        for img in images_list:
+            writer.add_image(img[1] if isinstance(img, tuple) else img)
 
 
-def create_zip(path: str, images_list: list[str]) -> None:
+def create_zip(path: str, images_list: list[Union[str, tuple[str, bytes]]]) -> None:
     """
     Create a ZIP file from a list of images
     :param path: str - path of the ZIP file
-    :param images_list: list[str] - list of images
+    :param images_list: list[Union[str, tuple[str, bytes]]] - list of images paths or (name, content) of images
     :return: None
     """
     with ZipFile(path, 'w') as zipObj:
         for img in images_list:
-            zipObj.write(img, img.split(os.sep)[-1])
+            if isinstance(img, tuple):
+                zipObj.writestr(img[0], img[1])
+            else:
+                zipObj.write(img, img.split(os.sep)[-1])
 
 
-def create_cbz(path: str, images_list: list[str]) -> None:
+def create_cbz(path: str, images_list: list[Union[str, tuple[str, bytes]]]) -> None:
     """
     Create a CBZ file from a list of images
     :param path: str - path of the CBZ file
-    :param images_list: list[str] - list of images
+    :param images_list: list[Union[str, tuple[str, bytes]]] - list of images paths or (name, content) of images
     :return: None
     """
     create_zip(path, images_list)
@@ -0,0 +1,13 @@
+from . import Logger
+
+
+class MemoryLogger(Logger):
+    """
+    Keep the messages in memory, to give them later to other loggers (ex: logs of a worker process)
+    """
+
+    def __init__(self):
+        self.messages: list[str] = []
+
+    def log(self, msg: str) -> None:
+        self.messages.append(msg)
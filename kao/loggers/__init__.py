@@ -1,3 +1,5 @@
 from .Logger import Logger
 from .FileLogger import FileLogger
 from .ConsoleLogger import ConsoleLogger
+from .MemoryLogger import MemoryLogger
+from . import logger_utils
@@ -0,0 +1,12 @@
+from . import Logger
+
+
+def log(loggers: list[Logger], message: str) -> None:
+    """
+    Call all loggers to log a message
+    :param loggers: list[Logger] - list of loggers
+    :param message: str - message to log
+    :return: None
+    """
+    for logger in loggers:
+        logger.log(message)
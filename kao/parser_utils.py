@@ -0,0 +1,104 @@
+import argparse
+
+from .pipelines import RecompressionProfile
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    All arguments for the program
+    :return: argparse.ArgumentParser - parser with all arguments
+    """
+    allowed_ext = ["pdf", "zip", "cbz"]
+    parser = argparse.ArgumentParser(description='Downloader of manwha or manga scans')
+
+    # hidden argument
+    parser.add_argument("--log",
+                        dest="logs",
+                        help=argparse.SUPPRESS,
+                        action="store_true",
+                        default=False)
+    parser.add_argument("-l",
+                        "--links",
+                        nargs="+",
+                        dest="links",
+                        help="Give chapters or series links (example: py __main__.py -l link1 link2) "
+                             "(example2: py __main__.py -l link1 link2 -r file -m)")
+    parser.add_argument("-k",
+                        "--keep-img",
+                        dest="keep_img",
+                        help="If you want keep all images after download (example: py __main__.py -kl link) "
+                             "(example2: py __main__.py -kl link -r file -m)",
+                        action="store_true",
+                        default=False)
+    parser.add_argument("-f",
+                        "--force",
+                        dest="force_re_dl",
+                        help="Download again the scan (example: py __main__.py -fl link) "
+                             "(example2: py __main__.py -fkl link -r file -f)",
+                        action="store_true",
+                        default=False)
+    parser.add_argument("-e",
+                        "--extension",
+                        type=str,
+                        dest="ext_file",
+                        help="define witch file do you want create after download: "
+                             "{}  (example: py __main__.py -fkl link -e pdf) ".format(", ".join(allowed_ext)),
+                        default="")
+    parser.add_argument("-m",
+                        "--move-files",
+                        dest="move_files",
+                        nargs="?",
+                        help="Move all specific files to the folder with the same extension name, dont forget to use -e"
+                             " (folder will be created if not exists at the root of the downloads folder),"
+                             " put ALWAYS at the end of command to move all pdf files"
+                             " (example: py __main__.py -fkl link -e pdf -m)"
+                             " (example2: py __main__.py -fkl link -e pdf -m ./myFolder)",
+                        default=False)
+    parser.add_argument("-r",
+                        "--Read-file",
+                        dest="read_file",
+                        nargs="?",
+                        help="Read given file to get urls, default is './list url.txt' but you can specify another "
+                             "(example: py __main__.py -fkr file) (example2: py __main__.py -fkl link -r file -m)",
+                        default=False)
+    parser.add_argument("-a",
+                        "--async",
+                        dest="async_engine",
+                        help="Use the asyncio engine to download all series and chapters at the same time "
+                             "(example: py __main__.py -al link1 link2)",
+                        action="store_true",
+                        default=False)
+    parser.add_argument("--page-height",
+                        type=int,
+                        dest="page_height",
+                        help="Restitch the slices of long strip chapters into pages of about this height in pixels, "
+                             "cut between the panels (example: py __main__.py -l link -e pdf --page-height 2000)",
+                        default=0)
+    parser.add_argument("--profile",
+                        dest="profile",
+                        choices=list(RecompressionProfile.get_profiles()),
+                        help="Downscale and recompress the images wider than the screen of the reading device when "
+                             "creating the files (example: py __main__.py -l link -e pdf --profile eink)",
+                        default=None)
+    parser.add_argument("--grayscale",
+                        dest="grayscale_pages",
+                        help="Store with a single channel the black and white pages shipped as colour images when "
+                             "creating the files, the colour pages are kept (example: py __main__.py -l link -e cbz "
+                             "--grayscale)",
+                        action="store_true",
+                        default=False)
+    parser.add_argument("--dedup",
+                        dest="dedup",
+                        help="Store each downloaded picture once and link it in the chapters whose images are kept, "
+                             "the pictures already stored are not fetched again and the pictures whose sha256 is in "
+                             "'.kao_store/blocklist.txt' are dropped (example: py __main__.py -kl link --dedup)",
+                        action="store_true",
+                        default=False)
+    parser.add_argument("-s",
+                        "--support",
+                        dest="support",
+                        help="Said supported websites (example: py __main__.py -s)",
+                        action="store_true",
+                        default=False)
+
+    return parser
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from . import RecompressionProfile
+
+
+class AssemblyOptions:
+    """
+    Options of the creation of the chapters files
+    """
+
+    def __init__(self, page_height: int = 0, page_quality: int = 90, profile: Optional[RecompressionProfile] = None,
+                 grayscale_pages: bool = False, state_dir: Optional[str] = None):
+        # height of the pages in pixels when the slices of long strip chapters are restitched, 0 to keep the slices
+        self.page_height = page_height
+        # JPEG quality of the pages encoded again (restitched pages, black and white pages) without profile
+        self.page_quality = page_quality
+        # size and quality of the images for the reading device, None to keep the downloaded images
+        self.profile = profile
+        # True to store the black and white pages shipped as colour images with a single channel
+        self.grayscale_pages = grayscale_pages
+        # folder of the state of kao (root of the downloads folder) where the metadata of the scanned images are cached
+        self.state_dir = state_dir
+
+    def restitch_pages(self) -> bool:
+        return self.page_height > 0
+
+    def recompress_images(self) -> bool:
+        return self.profile is not None
+
+    def reencode_images(self) -> bool:
+        return self.recompress_images() or self.grayscale_pages
+
+    def get_max_width(self) -> int:
+        """
+        Get the maximum width of the pages
+        :return: int - width of the screen of the profile, 0 to keep the width of the images
+        """
+        return self.profile.max_width if self.profile is not None else 0
+
+    def get_quality(self) -> int:
+        """
+        Get the JPEG quality of the pages encoded again, the quality of the profile when it is set
+        :return: int - JPEG quality (1-95)
+        """
+        return self.profile.quality if self.profile is not None else self.page_quality
+
+    def is_grayscale_profile(self) -> bool:
+        return self.profile is not None and self.profile.grayscale
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from .. import kao_utils
+from ..downloaders import Chapter
+from ..loggers import Logger, MemoryLogger
+from ..registries import DownloaderRegistry
+from . import AssemblyOptions
+
+
+def _build_chapter_file(chapter: Chapter, ext_file: str, force_re_dl: bool, full_logs: bool,
+                        options: AssemblyOptions) -> list[str]:
+    """
+    Build the file of a chapter in a worker process
+    :param chapter: Chapter - chapter to build, with its path
+    :param ext_file: str - file extension to create
+    :param force_re_dl: bool - if True, make again the action the selected action
+    :param full_logs: bool - if True, display all logs
+    :param options: AssemblyOptions - options of the creation of the file
+    :return: list[str] - messages logged while building the file
+    """
+    logger = MemoryLogger()
+    try:
+        kao_utils.build_chapter_file(chapter, ext_file, force_re_dl, [logger], full_logs, options)
+    except Exception as e:
+        logger.log("[Error][{}][Chapter] '{}': {}".format(chapter.platform, chapter.get_full_name(), e))
+    # the pictures of the chapter are released by the main process once the file is built
+    return logger.messages
+
+
+class AssemblyPipeline:
+    """
+    Build the files (PDF, ZIP, CBZ) of downloaded chapters in worker processes while the next chapters are downloading
+    The assembly is CPU bound, so chapters are built in parallel on all cores. The logs of each chapter are given to
+    the loggers once its file is built.
+    The number of chapters in flight is bounded: when the assembly is slower than the download, submit() blocks the
+    downloader. The chapters whose pictures are kept in memory are copied into the worker, so only a few of them are in
+    flight whatever the number of cores
+    """
+
+    def __init__(self, list_downloaders: DownloaderRegistry, loggers: list[Logger], ext_file: str,
+                 force_re_dl: bool, max_workers: Optional[int] = None, max_queued_chapters: int = 8,
+                 options: Optional[AssemblyOptions] = None, max_in_memory_chapters: int = 2):
+        self.list_downloaders = list_downloaders
+        self.loggers = loggers
+        self.ext_file = ext_file
+        self.force_re_dl = force_re_dl
+        self.options = options if options is not None else AssemblyOptions()
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count() or 1
+        self.slots = threading.BoundedSemaphore(self.max_workers + max_queued_chapters)
+        # each chapter kept in memory holds up to Downloader.max_in_memory_chapter_size bytes of pictures
+        self.in_memory_slots = threading.BoundedSemaphore(max_in_memory_chapters)
+        # created on the first chapter to build, "spawn" because the downloaders run threads in this process
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "AssemblyPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def submit(self, chapter: Chapter, full_logs: bool = False) -> None:
+        """
+        Send a downloaded chapter to build its file, wait while too many chapters are in flight
+        :param chapter: Chapter - downloaded chapter
+        :param full_logs: bool - if True, display all logs
+        :return: None
+        """
+        if self.ext_file == "":
+            kao_utils.release_chapter_images(chapter)
+            return
+
+        chapter.set_path(kao_utils.get_chapter_path(kao_utils.get_series_path(self.list_downloaders, chapter),
+                                                    chapter))
+        # the chapters already downloaded are sent too, only the ones without file need a worker
+        if not self.force_re_dl and os.path.exists(kao_utils.get_chapter_file_path(chapter, self.ext_file)):
+            kao_utils.log(self.loggers, "[Info][{}][Chapter] '{}': {} already created"
+                          .format(chapter.platform, chapter.get_full_name(), self.ext_file))
+            kao_utils.release_chapter_images(chapter)
+            return
+        in_memory = any(isinstance(img, tuple) for img in chapter.get_images() or [])
+        if in_memory:
+            self.in_memory_slots.acquire()
+        self.slots.acquire()
+        try:
+            future = self._get_executor().submit(_build_chapter_file, chapter, self.ext_file, self.force_re_dl,
+                                                 full_logs, self.options)
+        except Exception:
+            self._release_slots(in_memory)
+            raise
+        future.add_done_callback(lambda f: self._on_chapter_built(chapter, f, in_memory))
+
+    def _release_slots(self, in_memory: bool) -> None:
+        self.slots.release()
+        if in_memory:
+            self.in_memory_slots.release()
+
+    def _on_chapter_built(self, chapter: Chapter, future: Future, in_memory: bool) -> None:
+        """
+        Give the logs of the worker to the loggers and release the chapter
+        :param chapter: Chapter - built chapter
+        :param future: Future - result of the worker
+        :param in_memory: bool - True if the pictures of the chapter are kept in memory
+        :return: None
+        """
+        try:
+            for message in future.result():
+                kao_utils.log(self.loggers, message)
+        except Exception as e:
+            kao_utils.log(self.loggers, "[Error][{}][Chapter] '{}': {}"
+                          .format(chapter.platform, chapter.get_full_name(), e))
+        finally:
+            kao_utils.release_chapter_images(chapter)
+            self._release_slots(in_memory)
+
+    def close(self) -> None:
+        """
+        Wait until all submitted chapters are built and stop the workers
+        :return: None
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,26 @@
+class RecompressionProfile:
+    """
+    Size and quality of the images for a kind of reading device
+    The images wider than the profile are downscaled and recompressed as JPEG, the other ones are kept as is
+    """
+
+    def __init__(self, name: str, max_width: int, quality: int, grayscale: bool = False):
+        self.name = name
+        # width of the screen in pixels
+        self.max_width = max_width
+        # JPEG quality of the recompressed images
+        self.quality = quality
+        # True for the e-ink screens, which only display gray levels
+        self.grayscale = grayscale
+
+    @classmethod
+    def get_profiles(cls) -> dict[str, "RecompressionProfile"]:
+        """
+        Get the available profiles
+        :return: dict[str, RecompressionProfile] - name -> profile
+        """
+        return {profile.name: profile for profile in [
+            cls("phone", 1080, 80),
+            cls("tablet", 1600, 85),
+            cls("eink", 1072, 75, grayscale=True),
+        ]}
@@ -0,0 +1,13 @@
+import importlib
+
+from .RecompressionProfile import RecompressionProfile
+from .AssemblyOptions import AssemblyOptions
+
+
+def __getattr__(name: str):
+    # the pipeline loads the downloaders, it is imported on first use
+    if name != "AssemblyPipeline":
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    value = getattr(importlib.import_module(".AssemblyPipeline", __name__), name)
+    globals()[name] = value
+    return value
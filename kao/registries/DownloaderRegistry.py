@@ -0,0 +1,227 @@
+import importlib
+import os
+import re
+import threading
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from ..loggers import Logger
+
+if TYPE_CHECKING:
+    from ..downloaders import Downloader
+    from ..storages import ImageStore
+    from ..transports import Transport
+
+
+class DownloaderRegistry(Mapping[str, "Downloader"]):
+    """
+    Downloaders of the supported platforms, by platform name
+    Each platform is declared with the name of its downloader class, the hosts of its website and the patterns of its
+    series and chapters links, which is enough to sort the links: the hosts and the patterns are only declared here. The
+    class of a downloader (and its dependencies) is imported, and the downloader (and its session) is built, only when a
+    link of its platform is downloaded.
+    Each host of a website or of its pictures has its rate limit of the requests, set on the transport of the
+    downloader when it is built, and each platform its number of pictures fetched at the same time, which sizes the
+    pools of the shared transport.
+    """
+
+    def __init__(self, base_dir: str, loggers: list[Logger] = None):
+        self.base_dir = base_dir
+        self.loggers = loggers if loggers is not None else []
+        # platform -> (name of the class in kao.downloaders, hosts of the website)
+        self.entries: dict[str, tuple[str, list[str]]] = {}
+        # platform -> (pattern of the series links, pattern of the chapters links), compiled once
+        self.link_patterns: dict[str, tuple[Optional[re.Pattern], Optional[re.Pattern]]] = {}
+        # platform -> hosts serving the pictures of the website, when they are not the hosts of the website
+        self.picture_hosts: dict[str, list[str]] = {}
+        # host -> (requests per second, burst) of the requests (pages and pictures) sent to the host
+        self.host_rates: dict[str, tuple[float, int]] = {}
+        # platform -> number of pictures fetched at the same time when downloading a chapter
+        self.pictures_workers: dict[str, int] = {}
+        self.downloaders: dict[str, "Downloader"] = {}
+        self.image_store: Optional["ImageStore"] = None
+        self.lock = threading.RLock()
+
+    @classmethod
+    def create_default(cls, base_dir: str, loggers: list[Logger] = None) -> "DownloaderRegistry":
+        """
+        Get a registry of all supported platforms
+        :param base_dir: str - folder of the downloads
+        :param loggers: list[Logger] - list of loggers
+        :return: DownloaderRegistry - registry of all supported platforms
+        """
+        registry = cls(base_dir, loggers)
+        # the local folders are sorted by the downloaders without host
+        registry.register("PersonalDownloader", "PersonalDownloader", [])
+        registry.register("Webtoon", "WebtoonDownloader", ["webtoons.com"],
+                          series_link_regex=r"https?://(www\.)?webtoons\.com/\w{2}/[\w\-%]+/[\w\-%]+/"
+                                            r"list\?title_no=\d+$",
+                          chapter_link_regex=r"https?://(www\.)?webtoons\.com/\w{2}/[\w\-%]+/[\w\-%]+/"
+                                             r"[a-zA-Z\d-]+/viewer\?title_no=\d*&episode_no=\d+$",
+                          # webtoon-phinf CDN handles a lot of parallel requests
+                          requests_per_second=20, requests_burst=40, pictures_workers=8)
+        registry.register_picture_hosts("Webtoon", ["webtoon-phinf.pstatic.net"], requests_per_second=40,
+                                        requests_burst=32)
+        registry.register("Manga18.club", "Manga18Downloader", ["manga18.club"],
+                          series_link_regex=r"https?://(www\.)?manga18\.club/manhwa/((\w*-*%*)+\d*)/?$",
+                          chapter_link_regex=r"https?://(www\.)?manga18\.club/manhwa/.+/(\w+-)?\d+/?$")
+        registry.register("Manhuascan", "ManhuascanDownloader", ["manhuascan.us"],
+                          series_link_regex=r"https?://(www\.)?manhuascan\.us/manga/[\w\-%]+/?$",
+                          chapter_link_regex=r"https?://(www\.)?manhuascan\.us/manga/.+/([\w\-%]+)?\d+/?$")
+        # small scanlation websites, requested slowly
+        registry.register("ReaperScans", "ReaperScansDownloader", ["reaperscans.fr"],
+                          series_link_regex=r"https?://(www\.)?reaperscans\.fr/series?/[^/?]+/?$",
+                          chapter_link_regex=r"https?://(www\.)?reaperscans\.fr/series?/[^/]+/chapitre-\d+/?$",
+                          requests_per_second=2, requests_burst=4)
+        registry.register("Mangas-Origines", "MangasOriginesDownloader", ["mangas-origines.fr"],
+                          series_link_regex=r"https?://(www\.)?mangas-origines\.fr/manga/[\w\-%]+/?$",
+                          chapter_link_regex=r"https?://(www\.)?mangas-origines\.fr/manga/[\w\-%]+/"
+                                             r"chapitre-\d+([\w\-%]+)?/?(\?style=(list|paged))?$",
+                          requests_per_second=2, requests_burst=4)
+        registry.register("Mangas-Origines-X", "MangasOriginesXDownloader", ["x.mangas-origines.fr"],
+                          series_link_regex=r"https?://(www\.)?x\.mangas-origines\.fr/(oeuvre|mangas)/[\w\-%]+/?$",
+                          chapter_link_regex=r"https?://(www\.)?x\.mangas-origines\.fr/(oeuvre|mangas?)/[\w\-%]+/"
+                                             r"chapitre-\d+([\w\-%]+)?/?(\?style=(list|paged))?$",
+                          requests_per_second=2, requests_burst=4)
+        registry.register("Manga-Scantrad", "MangaScantradDownloader", ["manga-scantrad.net"],
+                          series_link_regex=r"https?://(www\.)?manga-scantrad\.net/manga/[\w\-%]+/?$",
+                          chapter_link_regex=r"https?://(www\.)?manga-scantrad\.net/manga/[\w\-%]+/((chapitre|ch)-)?\d+"
+                                             r"([\w\-%]+)?/?(\?style=(list|paged))?$",
+                          requests_per_second=2, requests_burst=4)
+        return registry
+
+    def register(self, platform: str, class_name: str, hosts: list[str], series_link_regex: Optional[str] = None,
+                 chapter_link_regex: Optional[str] = None, requests_per_second: float = 4,
+                 requests_burst: int = 8, pictures_workers: int = 4) -> None:
+        """
+        Declare a platform, its downloader is not imported
+        :param platform: str - name of the platform (the platform attribute of the downloader class)
+        :param class_name: str - name of the downloader class in kao.downloaders
+        :param hosts: list[str] - hosts of the website (without "www."), empty for the local folders
+        :param series_link_regex: Optional[str] - pattern of the series links of the website, None for the local folders
+        :param chapter_link_regex: Optional[str] - pattern of the chapters links of the website, None for the local
+         folders
+        :param requests_per_second: float - requests per second allowed to each host of the website, the pictures
+         served by the website included
+        :param requests_burst: int - requests sent at once to a host before being limited
+        :param pictures_workers: int - number of pictures fetched at the same time when downloading a chapter
+        :return: None
+        """
+        with self.lock:
+            self.entries[platform] = (class_name, hosts)
+            self.link_patterns[platform] = (re.compile(series_link_regex) if series_link_regex is not None else None,
+                                            re.compile(chapter_link_regex) if chapter_link_regex is not None else None)
+            self.pictures_workers[platform] = pictures_workers
+            for host in hosts:
+                self.host_rates[host] = (requests_per_second, requests_burst)
+
+    def register_picture_hosts(self, platform: str, hosts: list[str], requests_per_second: float = 4,
+                               requests_burst: int = 8) -> None:
+        """
+        Declare the hosts serving the pictures of a platform (CDN), when they are not the hosts of the website
+        :param platform: str - name of the registered platform
+        :param hosts: list[str] - hosts of the pictures (without "www.")
+        :param requests_per_second: float - pictures requests per second allowed to each host
+        :param requests_burst: int - pictures requests sent at once to a host before being limited
+        :return: None
+        """
+        with self.lock:
+            self.picture_hosts[platform] = hosts
+            for host in hosts:
+                self.host_rates[host] = (requests_per_second, requests_burst)
+
+    def get_hosts(self, platform: str) -> list[str]:
+        """
+        Get the hosts of the website of a platform, the links are dispatched to the downloader by their host
+        :param platform: str - name of the platform
+        :return: list[str] - hosts of the website (without "www."), empty for the local folders
+        """
+        return self.entries[platform][1]
+
+    def is_a_series_link(self, platform: str, link: str) -> bool:
+        """
+        Check if the given link is a link of a series of a platform, without importing its downloader
+        :param platform: str - name of the platform
+        :param link: str - https://myWebsite.com/series/seriesName, or a folder of chapters folders for the local
+         folders
+        :return: bool - True if the link is a link of a series
+        """
+        if not self.get_hosts(platform):
+            return self._is_a_local_folder(link) and not self._folder_contains_files(link)
+        series_link_regex = self.link_patterns[platform][0]
+        return series_link_regex is not None and series_link_regex.search(link) is not None
+
+    def is_a_chapter_link(self, platform: str, link: str) -> bool:
+        """
+        Check if the given link is a link of a chapter of a platform, without importing its downloader
+        :param platform: str - name of the platform
+        :param link: str - https://myWebsite.com/series/seriesName/chapterName, or a folder of pictures for the local
+         folders
+        :return: bool - True if the link is a chapter link
+        """
+        if not self.get_hosts(platform):
+            return self._is_a_local_folder(link) and self._folder_contains_files(link)
+        chapter_link_regex = self.link_patterns[platform][1]
+        return chapter_link_regex is not None and chapter_link_regex.search(link) is not None
+
+    @staticmethod
+    def _is_a_local_folder(link: str) -> bool:
+        return "://" not in link and os.path.isdir(link)
+
+    @staticmethod
+    def _folder_contains_files(folder_path: str) -> bool:
+        with os.scandir(folder_path) as entries:
+            return any(entry.is_file() for entry in entries)
+
+    def get_class(self, platform: str) -> type:
+        """
+        Import the downloader class of a platform
+        :param platform: str - name of the platform
+        :return: type - downloader class
+        """
+        return getattr(importlib.import_module("..downloaders", __package__), self.entries[platform][0])
+
+    def get_transport(self) -> "Transport":
+        """
+        Get the transport shared by the downloaders, its pools are sized for the pictures of the chapters downloaded at
+        the same time from a host by the asyncio engine, with the most pictures workers of the platforms
+        :return: Transport - the shared transport
+        """
+        from ..downloaders import AsyncDownloader
+        from ..transports import Transport
+
+        return Transport.get_shared(AsyncDownloader.max_chapters_per_host * max(self.pictures_workers.values()))
+
+    def set_image_store(self, image_store: Optional["ImageStore"]) -> None:
+        """
+        Set the store where the downloaded pictures are deduplicated, for the built and the next downloaders
+        :param image_store: Optional[ImageStore] - store of the pictures
+        :return: None
+        """
+        with self.lock:
+            self.image_store = image_store
+            for downloader in self.downloaders.values():
+                downloader.set_image_store(image_store)
+
+    def __getitem__(self, platform: str) -> "Downloader":
+        with self.lock:
+            if platform not in self.downloaders:
+                if platform not in self.entries:
+                    raise KeyError(platform)
+                downloader = self.get_class(platform)(self.base_dir, self.loggers, self.get_transport())
+                downloader.max_pictures_workers = self.pictures_workers[platform]
+                for host in self.get_hosts(platform) + self.picture_hosts.get(platform, []):
+                    downloader.transport.set_host_rate(host, *self.host_rates[host])
+                if self.image_store is not None:
+                    downloader.set_image_store(self.image_store)
+                self.downloaders[platform] = downloader
+            return self.downloaders[platform]
+
+    def __contains__(self, platform: object) -> bool:
+        return platform in self.entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
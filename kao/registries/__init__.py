@@ -0,0 +1 @@
+from .DownloaderRegistry import DownloaderRegistry
@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+from typing import Optional
+
+from ..downloaders import downloader_utils
+
+
+class ChapterManifest:
+    """
+    Pages of a chapter already fetched and validated, stored in the chapter folder while the chapter is downloading
+    A retry or an interrupted run only fetches the missing pages. Fetched pages are kept under a staging name until
+    the whole chapter is done, then the manifest is removed.
+    """
+    file_name = ".kao_pages.json"
+    staging_prefix = ".kao-"
+    part_suffix = ".part"
+
+    def __init__(self, chapter_path: str, pictures_links: list[str]):
+        self.chapter_path = chapter_path
+        self.manifest_path = os.path.join(chapter_path, self.file_name)
+        self.links = [downloader_utils.canonical_link(link) for link in pictures_links]
+        self.lock = threading.Lock()
+        # index of the page -> {status: 'ok' | 'fake' | 'skipped', probe: [format, width, height, mode], content}
+        self.pages: dict[int, dict] = {}
+        self._load()
+        self._remove_stale_files()
+
+    @classmethod
+    def exists(cls, chapter_path: str) -> bool:
+        """
+        Check if the chapter folder holds an unfinished download
+        :param chapter_path: str - path to the chapter
+        :return: bool - True if a manifest exists in the chapter folder
+        """
+        return os.path.exists(os.path.join(chapter_path, cls.file_name))
+
+    def _load(self) -> None:
+        """
+        Load the pages of a previous run, they are dropped when the pictures links of the chapter have changed
+        :return: None
+        """
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("links") != self.links:
+            return
+        self.pages = {int(index): entry for index, entry in manifest.get("pages", {}).items()}
+
+    @classmethod
+    def is_staging_file(cls, file_name: str) -> bool:
+        """
+        Check if a file of the chapter folder is a page of an unfinished download, which is not a page of the chapter
+        :param file_name: str - name of the file
+        :return: bool - True for the staging and partial files
+        """
+        return file_name.startswith(cls.staging_prefix) or file_name.endswith(cls.part_suffix)
+
+    def _remove_stale_files(self) -> None:
+        """
+        Remove the partial files and the staging files of the pages which are not in the manifest, for example when the
+        pictures links of the chapter have changed since the previous attempt
+        :return: None
+        """
+        if not os.path.isdir(self.chapter_path):
+            return
+        kept_files = {os.path.basename(self.get_staging_path(index, entry["probe"][0]))
+                      for index, entry in self.pages.items() if entry["status"] == "ok"}
+        for file_name in os.listdir(self.chapter_path):
+            if self.is_staging_file(file_name) and file_name not in kept_files:
+                os.remove(os.path.join(self.chapter_path, file_name))
+
+    def _save(self) -> None:
+        with open(self.manifest_path + ".tmp", "w") as f:
+            json.dump({"links": self.links, "pages": self.pages}, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+
+    def get_part_path(self, index: int) -> str:
+        return os.path.join(self.chapter_path, ".{}{}".format(index, self.part_suffix))
+
+    def get_staging_path(self, index: int, extension: str) -> str:
+        return os.path.join(self.chapter_path, "{}{}.{}".format(self.staging_prefix, index, extension))
+
+    def get_page(self, index: int) -> Optional[dict]:
+        """
+        Get a page fetched by a previous attempt
+        :param index: int - index of the page in the pictures links
+        :return: Optional[dict] - entry of the page, None if the page has to be fetched
+        """
+        with self.lock:
+            entry = self.pages.get(index)
+        if entry is None:
+            return None
+        if entry["status"] == "ok" and not os.path.exists(self.get_staging_path(index, entry["probe"][0])):
+            return None
+        return entry
+
+    def set_page(self, index: int, entry: dict) -> None:
+        """
+        Record a fetched page
+        :param index: int - index of the page in the pictures links
+        :param entry: dict - {status: 'ok' | 'fake' | 'skipped', probe: [format, width, height, mode], content}
+        :return: None
+        """
+        with self.lock:
+            self.pages[index] = entry
+            self._save()
+
+    def remove(self) -> None:
+        """
+        Remove the manifest once all the pages are renamed to their final name
+        :return: None
+        """
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
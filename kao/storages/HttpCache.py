@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+
+class HttpCache:
+    """
+    Cache of HTTP responses on the disk, limited in size (least recently used responses are removed first)
+    Each response is stored with its ETag / Last-Modified headers to revalidate it with a conditional request
+    """
+    # one instance per directory, so all downloaders share the same size accounting
+    _instances: dict[str, "HttpCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_size: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.lock = threading.RLock()
+        # key -> size of the body, None until the directory is scanned
+        self.sizes: Optional[dict[str, int]] = None
+
+    @classmethod
+    def for_directory(cls, cache_dir: str, max_size: int = 256 * 1024 * 1024) -> "HttpCache":
+        """
+        Get the cache of a directory
+        :param cache_dir: str - directory of the cache
+        :param max_size: int - maximum size of the cache in bytes
+        :return: HttpCache - the shared cache of the directory
+        """
+        cache_dir = os.path.abspath(cache_dir)
+        with cls._instances_lock:
+            if cache_dir not in cls._instances:
+                cls._instances[cache_dir] = cls(cache_dir, max_size)
+            return cls._instances[cache_dir]
+
+    @staticmethod
+    def get_key(method: str, link: str, data: Optional[dict] = None) -> str:
+        """
+        Get the key of a request
+        :param method: str - HTTP method
+        :param link: str - requested link
+        :param data: Optional[dict] - body of the request
+        :return: str - key of the request
+        """
+        request = json.dumps([method.upper(), link, data], sort_keys=True, default=str)
+        return hashlib.sha1(request.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        return os.path.join(self.cache_dir, key + ".body"), os.path.join(self.cache_dir, key + ".json")
+
+    def _load(self) -> dict[str, int]:
+        """
+        Scan the cache directory on first use
+        :return: dict[str, int] - size of the body of each cached response
+        """
+        if self.sizes is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.sizes = {}
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith(".body"):
+                    self.sizes[file_name[:-len(".body")]] = os.path.getsize(os.path.join(self.cache_dir, file_name))
+        return self.sizes
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Get a cached response
+        :param key: str - key of the request
+        :return: Optional[dict] - {content, etag, last_modified, stored_at} or None if not cached
+        """
+        with self.lock:
+            if key not in self._load():
+                return None
+            body_path, meta_path = self._paths(key)
+            try:
+                with open(meta_path, "r") as f:
+                    entry = json.load(f)
+                with open(body_path, "rb") as f:
+                    entry["content"] = f.read()
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+            # the modification time of the body is used as last access time for the eviction
+            os.utime(body_path)
+            return entry
+
+    def set(self, key: str, content: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """
+        Store a response, then remove the least recently used responses if the cache is too large
+        :param key: str - key of the request
+        :param content: bytes - body of the response
+        :param etag: Optional[str] - ETag header of the response
+        :param last_modified: Optional[str] - Last-Modified header of the response
+        :return: None
+        """
+        with self.lock:
+            sizes = self._load()
+            body_path, meta_path = self._paths(key)
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(content)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump({"etag": etag, "last_modified": last_modified, "stored_at": time.time()}, f)
+            os.replace(body_path + ".tmp", body_path)
+            os.replace(meta_path + ".tmp", meta_path)
+            sizes[key] = len(content)
+            self._evict()
+
+    def refresh(self, key: str) -> None:
+        """
+        Mark a cached response as fresh (the server answered 304 Not Modified)
+        :param key: str - key of the request
+        :return: None
+        """
+        with self.lock:
+            if key not in self._load():
+                return
+            _, meta_path = self._paths(key)
+            with open(meta_path, "r") as f:
+                entry = json.load(f)
+            entry["stored_at"] = time.time()
+            with open(meta_path, "w") as f:
+                json.dump(entry, f)
+
+    def _remove(self, key: str) -> None:
+        for file_path in self._paths(key):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self._load().pop(key, None)
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used responses until the cache fits its maximum size
+        :return: None
+        """
+        sizes = self._load()
+        total_size = sum(sizes.values())
+        if total_size <= self.max_size:
+            return
+        keys_by_access = sorted(sizes, key=lambda k: os.path.getmtime(self._paths(k)[0]))
+        for key in keys_by_access:
+            if total_size <= self.max_size:
+                break
+            total_size -= sizes[key]
+            self._remove(key)
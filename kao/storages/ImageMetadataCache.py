@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from ..downloaders import downloader_utils
+
+
+class ImageMetadataCache:
+    """
+    Metadata of the images of a folder (image or not, format, dimensions, mode), stored in the '.kao_images' folder of
+    the state of kao (the folders of the user are not written), one file per scanned folder
+    An entry is used while the size and the modification time of its file are unchanged, so scanning again a folder
+    does not open any image
+    """
+    folder_name = ".kao_images"
+
+    def __init__(self, folder_path: str, state_dir: Optional[str] = None):
+        """
+        :param folder_path: str - folder of the images
+        :param state_dir: Optional[str] - folder of the state of kao (root of the downloads folder), None to keep the
+         metadata in memory only
+        """
+        self.folder_path = folder_path
+        self.cache_path = None
+        if state_dir is not None:
+            folder_key = hashlib.sha1(os.path.abspath(folder_path).encode("utf-8")).hexdigest()
+            self.cache_path = os.path.join(state_dir, self.folder_name, folder_key + ".json")
+        # file name -> {size, mtime_ns, image: bool, probe: [format, width, height, mode] | None}
+        self.entries: dict[str, dict] = {}
+        self.modified = False
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, "r") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def __enter__(self) -> "ImageMetadataCache":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.save()
+
+    def save(self) -> None:
+        """
+        Write the metadata file of the folder when entries have changed
+        :return: None
+        """
+        if not self.modified or self.cache_path is None:
+            return
+        # forget the files removed from the folder
+        self.entries = {name: entry for name, entry in self.entries.items()
+                        if os.path.exists(os.path.join(self.folder_path, name))}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path + ".tmp", "w") as f:
+                json.dump(self.entries, f)
+            os.replace(self.cache_path + ".tmp", self.cache_path)
+        except OSError:
+            # read-only state folder: the images are scanned again next time
+            pass
+        self.modified = False
+
+    def _get_entry(self, file_path: str) -> Optional[dict]:
+        entry = self.entries.get(os.path.basename(file_path))
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return entry
+
+    def _set_entry(self, file_path: str, is_image: bool, probe: Optional[downloader_utils.ImageProbe]) -> dict:
+        stat = os.stat(file_path)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "image": is_image,
+                 "probe": list(probe) if probe is not None else None}
+        self.entries[os.path.basename(file_path)] = entry
+        self.modified = True
+        return entry
+
+    def scan(self, file_path: str) -> dict:
+        """
+        Get the metadata of a file, read from the file only when it is not cached
+        :param file_path: str - path of the file in the folder
+        :return: dict - {size, mtime_ns, image: bool, probe: [format, width, height, mode] | None}
+        """
+        entry = self._get_entry(file_path)
+        if entry is not None:
+            return entry
+        is_image = downloader_utils.test_is_image(file_path)
+        probe = None
+        if is_image:
+            try:
+                probe = downloader_utils.probe_image_file(file_path)
+            except Exception:
+                probe = None
+        return self._set_entry(file_path, is_image, probe)
+
+    def is_image(self, file_path: str) -> bool:
+        return self.scan(file_path)["image"]
+
+    def probe(self, file_path: str) -> Optional[downloader_utils.ImageProbe]:
+        """
+        Get format, dimensions and mode of an image
+        :param file_path: str - path of the image in the folder
+        :return: Optional[ImageProbe] - the information of the image, None when it can not be read
+        """
+        probe = self.scan(file_path)["probe"]
+        return downloader_utils.ImageProbe(*probe) if probe is not None else None
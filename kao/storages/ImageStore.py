@@ -0,0 +1,123 @@
+import hashlib
+import os
+import shutil
+import threading
+from typing import Optional
+
+
+class ImageStore:
+    """
+    Content-addressed store of the downloaded pictures, at the root of the downloads folder
+    Each picture is stored once under its sha256, the chapters folders hold hardlinks to the stored files, so a picture
+    repeated in many chapters (credits, recruitment, ads) takes the disk space of a single file.
+    The pictures whose hash is in the blocklist file (one hash per line, the output of sha256sum is accepted) are
+    dropped from the chapters.
+    """
+    folder_name = ".kao_store"
+    blocklist_file_name = "blocklist.txt"
+    hash_chunk_size = 64 * 1024
+
+    def __init__(self, base_dir: str):
+        self.store_path = os.path.join(base_dir, self.folder_name)
+        self.blocklist_path = os.path.join(self.store_path, self.blocklist_file_name)
+        self.lock = threading.Lock()
+        self.blocklist: set[str] = set()
+        try:
+            with open(self.blocklist_path, "r") as f:
+                for line in f:
+                    words = line.split()
+                    if words and not words[0].startswith("#"):
+                        self.blocklist.add(words[0].lower())
+        except OSError:
+            pass
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @classmethod
+    def hash_file(cls, file_path: str) -> str:
+        """
+        Get the sha256 of a file, read by chunks
+        :param file_path: str - path of the file
+        :return: str - hexadecimal sha256 of the file
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.hash_chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_blocked(self, digest: str) -> bool:
+        return digest in self.blocklist
+
+    def get_path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.store_path, digest[:2], "{}.{}".format(digest, extension.lower()))
+
+    def has(self, digest: str, extension: str) -> bool:
+        return os.path.exists(self.get_path(digest, extension))
+
+    def read(self, digest: str, extension: str) -> bytes:
+        with open(self.get_path(digest, extension), "rb") as f:
+            return f.read()
+
+    def add_file(self, file_path: str, extension: str, digest: Optional[str] = None) -> str:
+        """
+        Store a file, the file becomes a hardlink to the stored picture
+        When the picture is already stored, the file is replaced by a link to the stored one
+        :param file_path: str - path of the picture to store
+        :param extension: str - extension of the picture
+        :param digest: Optional[str] - hash of the file when it is already known
+        :return: str - hash of the picture
+        """
+        if digest is None:
+            digest = self.hash_file(file_path)
+        stored_path = self.get_path(digest, extension)
+        with self.lock:
+            if os.path.exists(stored_path):
+                self.link_to(digest, extension, file_path)
+            else:
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                self._link(file_path, stored_path)
+        return digest
+
+    def add_content(self, content: bytes, extension: str) -> str:
+        """
+        Store a picture kept in memory
+        :param content: bytes - content of the picture
+        :param extension: str - extension of the picture
+        :return: str - hash of the picture
+        """
+        digest = self.hash_content(content)
+        stored_path = self.get_path(digest, extension)
+        with self.lock:
+            if not os.path.exists(stored_path):
+                os.makedirs(os.path.dirname(stored_path), exist_ok=True)
+                with open(stored_path + ".tmp", "wb") as f:
+                    f.write(content)
+                os.replace(stored_path + ".tmp", stored_path)
+        return digest
+
+    def link_to(self, digest: str, extension: str, destination_path: str) -> None:
+        """
+        Put a stored picture at a path of a chapter, replacing the file at this path
+        :param digest: str - hash of the picture
+        :param extension: str - extension of the picture
+        :param destination_path: str - path where to put the picture
+        :return: None
+        """
+        tmp_path = destination_path + ".link"
+        self._link(self.get_path(digest, extension), tmp_path)
+        os.replace(tmp_path, destination_path)
+
+    @staticmethod
+    def _link(source_path: str, destination_path: str) -> None:
+        """
+        Hardlink a file, copy it on the file systems without hardlinks
+        """
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        try:
+            os.link(source_path, destination_path)
+        except OSError:
+            shutil.copyfile(source_path, destination_path)
@@ -0,0 +1,65 @@
+import os
+import threading
+from typing import Optional, Union
+
+import numpy as np
+
+from .. import image_utils
+from ..downloaders import downloader_utils
+
+
+class JunkLibrary:
+    """
+    Known credit, recruitment and ad pages of a platform: the images put in the '.kao_junk' folder of the platform
+    A downloaded page whose perceptual hash is near the hash of a known page is dropped from the chapter, even when the
+    website re-encodes or rescales it
+    """
+    folder_name = ".kao_junk"
+    # maximum number of different bits (out of 64) between the hashes of two images of the same page
+    max_distance = 6
+
+    def __init__(self, folder_path: str):
+        self.folder_path = folder_path
+        self.lock = threading.Lock()
+        # hashes of the known pages, loaded on first use
+        self.hashes: Optional[np.ndarray] = None
+
+    def _load(self) -> np.ndarray:
+        """
+        Hash the images of the library folder on first use
+        :return: np.ndarray - hashes of the known pages (uint64)
+        """
+        with self.lock:
+            if self.hashes is not None:
+                return self.hashes
+            hashes = []
+            if os.path.isdir(self.folder_path):
+                for file_name in sorted(os.listdir(self.folder_path)):
+                    file_path = os.path.join(self.folder_path, file_name)
+                    if not os.path.isfile(file_path) or not downloader_utils.test_is_image(file_path):
+                        continue
+                    try:
+                        img_hash = image_utils.dhash(file_path)
+                    except Exception:
+                        continue
+                    if img_hash is not None:
+                        hashes.append(img_hash)
+            self.hashes = np.array(hashes, dtype=np.uint64)
+            return self.hashes
+
+    def is_junk(self, img: Union[str, tuple[str, bytes]]) -> bool:
+        """
+        Check if an image is one of the known pages, its hash is compared to all the known hashes at once
+        :param img: Union[str, tuple[str, bytes]] - path or (name, content) of the image
+        :return: bool - True if the image is near a known page
+        """
+        hashes = self._load()
+        if len(hashes) == 0:
+            return False
+        try:
+            img_hash = image_utils.dhash(img)
+        except Exception:
+            return False
+        if img_hash is None:
+            return False
+        return bool(image_utils.hamming_distances(img_hash, hashes).min() <= self.max_distance)
@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from ..downloaders import downloader_utils
+
+
+class Ledger:
+    """
+    Index of the downloaded chapters of a platform, stored in a SQLite database at the root of the downloads folder
+    The index is loaded once, then lookups are made in memory
+    """
+    file_name = "kao.sqlite3"
+
+    def __init__(self, base_dir: str, platform: str):
+        self.db_path = os.path.join(base_dir, self.file_name)
+        self.platform = platform
+        self.lock = threading.RLock()
+        self.connection: Optional[sqlite3.Connection] = None
+        # (series, chapter) -> row of the chapters table
+        self.chapters: dict[tuple[str, str], dict] = {}
+        # canonical chapter link -> (series, chapter)
+        self.links: dict[str, tuple[str, str]] = {}
+        # series whose downloaded_chapters.txt file has been imported (or does not exist)
+        self.imported_series: set[str] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the database and load the chapters of the platform on first use
+        :return: sqlite3.Connection - connection to the database
+        """
+        with self.lock:
+            if self.connection is not None:
+                return self.connection
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            connection.execute("CREATE TABLE IF NOT EXISTS chapters ("
+                               "platform TEXT NOT NULL, series TEXT NOT NULL, chapter TEXT NOT NULL, "
+                               "status TEXT NOT NULL, images INTEGER, size INTEGER, downloaded_at REAL, "
+                               "PRIMARY KEY (platform, series, chapter))")
+            connection.execute("CREATE TABLE IF NOT EXISTS imported_files ("
+                               "platform TEXT NOT NULL, series TEXT NOT NULL, PRIMARY KEY (platform, series))")
+            connection.execute("CREATE TABLE IF NOT EXISTS series_manifests ("
+                               "platform TEXT NOT NULL, series_link TEXT NOT NULL, fingerprint TEXT, "
+                               "links TEXT NOT NULL, PRIMARY KEY (platform, series_link))")
+            connection.execute("CREATE TABLE IF NOT EXISTS pictures ("
+                               "link TEXT NOT NULL PRIMARY KEY, hash TEXT NOT NULL, probe TEXT NOT NULL)")
+            # the link of the chapters has been added after the first version of the ledger
+            if "link" not in [column[1] for column in connection.execute("PRAGMA table_info(chapters)")]:
+                connection.execute("ALTER TABLE chapters ADD COLUMN link TEXT")
+            connection.commit()
+
+            for series, chapter, status, images, size, downloaded_at, link in connection.execute(
+                    "SELECT series, chapter, status, images, size, downloaded_at, link FROM chapters "
+                    "WHERE platform = ?", (self.platform,)):
+                self.chapters[(series, chapter)] = {"status": status, "images": images, "size": size,
+                                                    "downloaded_at": downloaded_at, "link": link}
+                if link is not None:
+                    self.links[link] = (series, chapter)
+            self.imported_series.update(series for series, in connection.execute(
+                "SELECT series FROM imported_files WHERE platform = ?", (self.platform,)))
+
+            self.connection = connection
+            return connection
+
+    def import_text_file(self, series: str, file_path: str) -> None:
+        """
+        Import the chapters of a downloaded_chapters.txt file (index used by the previous versions)
+        The file is imported only once per series
+        :param series: str - name of the series
+        :param file_path: str - path to the downloaded_chapters.txt file of the series
+        :return: None
+        """
+        with self.lock:
+            connection = self._connect()
+            if series in self.imported_series:
+                return
+            self.imported_series.add(series)
+            if not os.path.isfile(file_path):
+                return
+
+            downloaded_at = os.path.getmtime(file_path)
+            with open(file_path, "r") as f:
+                for line in f:
+                    chapter = line.strip()
+                    if chapter and (series, chapter) not in self.chapters:
+                        self._insert(series, chapter, "downloaded", None, None, downloaded_at, None)
+            connection.execute("INSERT OR IGNORE INTO imported_files (platform, series) VALUES (?, ?)",
+                               (self.platform, series))
+            connection.commit()
+
+    def get_chapter(self, series: str, chapter: str) -> Optional[dict]:
+        """
+        Get the entry of a chapter
+        :param series: str - name of the series
+        :param chapter: str - name of the chapter
+        :return: Optional[dict] - {status, images, size, downloaded_at, link} or None if the chapter is unknown
+        """
+        self._connect()
+        return self.chapters.get((series, chapter))
+
+    def get_chapter_by_link(self, link: str) -> Optional[tuple[str, str]]:
+        """
+        Get the series and the chapter name of a downloaded chapter from its link
+        :param link: str - link of the chapter
+        :return: Optional[tuple[str, str]] - (series, chapter) or None if the link is not downloaded
+        """
+        self._connect()
+        names = self.links.get(downloader_utils.canonical_link(link))
+        if names is None or not self.is_downloaded(*names):
+            return None
+        return names
+
+    def set_chapter_link(self, series: str, chapter: str, link: str) -> None:
+        """
+        Set the link of a known chapter (chapters imported from the text files have no link)
+        :param series: str - name of the series
+        :param chapter: str - name of the chapter
+        :param link: str - link of the chapter
+        :return: None
+        """
+        with self.lock:
+            connection = self._connect()
+            entry = self.chapters.get((series, chapter))
+            if entry is None:
+                return
+            self._insert(series, chapter, entry["status"], entry["images"], entry["size"], entry["downloaded_at"],
+                         link)
+            connection.commit()
+
+    def is_downloaded(self, series: str, chapter: str) -> bool:
+        """
+        Check if the chapter is already downloaded
+        :param series: str - name of the series
+        :param chapter: str - name of the chapter
+        :return: bool - True if the chapter is already downloaded
+        """
+        entry = self.get_chapter(series, chapter)
+        return entry is not None and entry["status"] == "downloaded"
+
+    def add_chapter(self, series: str, chapter: str, images: Optional[int] = None, size: Optional[int] = None,
+                    status: str = "downloaded", link: Optional[str] = None) -> None:
+        """
+        Add or update the entry of a chapter
+        :param series: str - name of the series
+        :param chapter: str - name of the chapter
+        :param images: Optional[int] - number of images of the chapter
+        :param size: Optional[int] - size of the images in bytes
+        :param status: str - status of the chapter
+        :param link: Optional[str] - link of the chapter
+        :return: None
+        """
+        with self.lock:
+            connection = self._connect()
+            self._insert(series, chapter, status, images, size, time.time(), link)
+            connection.commit()
+
+    def _insert(self, series: str, chapter: str, status: str, images: Optional[int], size: Optional[int],
+                downloaded_at: float, link: Optional[str]) -> None:
+        """
+        Write an entry in the database and in memory, the caller commits
+        """
+        if link is not None:
+            link = downloader_utils.canonical_link(link)
+            self.links[link] = (series, chapter)
+        self.connection.execute("INSERT OR REPLACE INTO chapters "
+                                "(platform, series, chapter, status, images, size, downloaded_at, link) "
+                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (self.platform, series, chapter, status, images, size, downloaded_at, link))
+        self.chapters[(series, chapter)] = {"status": status, "images": images, "size": size,
+                                            "downloaded_at": downloaded_at, "link": link}
+
+    def get_series_manifest(self, series_link: str) -> Optional[tuple[Optional[str], set[str]]]:
+        """
+        Get the manifest of a series: the chapters links already handled and the fingerprint of the last listing
+        :param series_link: str - link of the series
+        :return: Optional[tuple[Optional[str], set[str]]] - (fingerprint, canonical links) or None if unknown
+        """
+        with self.lock:
+            row = self._connect().execute(
+                "SELECT fingerprint, links FROM series_manifests WHERE platform = ? AND series_link = ?",
+                (self.platform, downloader_utils.canonical_link(series_link))).fetchone()
+        if row is None:
+            return None
+        fingerprint, links = row
+        return fingerprint, set(link for link in links.split("\n") if link)
+
+    def set_series_manifest(self, series_link: str, fingerprint: Optional[str], links: set[str]) -> None:
+        """
+        Save the manifest of a series
+        :param series_link: str - link of the series
+        :param fingerprint: Optional[str] - fingerprint of the listing when all its chapters are handled
+        :param links: set[str] - canonical links of the chapters already handled
+        :return: None
+        """
+        with self.lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO series_manifests (platform, series_link, fingerprint, links) "
+                               "VALUES (?, ?, ?, ?)",
+                               (self.platform, downloader_utils.canonical_link(series_link), fingerprint,
+                                "\n".join(sorted(links))))
+            connection.commit()
+
+    def get_pictures(self, links: list[str]) -> dict[str, tuple[str, downloader_utils.ImageProbe]]:
+        """
+        Get the hash of the pictures already downloaded, so they are taken from the image store without fetching them
+        :param links: list[str] - links of the pictures
+        :return: dict[str, tuple[str, ImageProbe]] - canonical link -> (hash, probe) of the known pictures
+        """
+        canonical_links = [downloader_utils.canonical_link(link) for link in links]
+        pictures = {}
+        with self.lock:
+            connection = self._connect()
+            # the number of parameters of a query is limited
+            for start in range(0, len(canonical_links), 500):
+                batch = canonical_links[start:start + 500]
+                for link, digest, probe in connection.execute(
+                        "SELECT link, hash, probe FROM pictures WHERE link IN ({})".format(", ".join("?" * len(batch))),
+                        batch):
+                    pictures[link] = (digest, downloader_utils.ImageProbe(*json.loads(probe)))
+        return pictures
+
+    def set_pictures(self, pictures: dict[str, tuple[str, downloader_utils.ImageProbe]]) -> None:
+        """
+        Save the hash of downloaded pictures
+        :param pictures: dict[str, tuple[str, ImageProbe]] - link -> (hash, probe) of the pictures
+        :return: None
+        """
+        if not pictures:
+            return
+        with self.lock:
+            connection = self._connect()
+            connection.executemany("INSERT OR REPLACE INTO pictures (link, hash, probe) VALUES (?, ?, ?)",
+                                   [(downloader_utils.canonical_link(link), digest, json.dumps(list(probe)))
+                                    for link, (digest, probe) in pictures.items()])
+            connection.commit()
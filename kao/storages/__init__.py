@@ -0,0 +1,6 @@
+from .Ledger import Ledger
+from .HttpCache import HttpCache
+from .ChapterManifest import ChapterManifest
+from .ImageMetadataCache import ImageMetadataCache
+from .ImageStore import ImageStore
+from .JunkLibrary import JunkLibrary
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Rate limit of the requests sent to a host: up to burst requests at once, then rate requests per second
+    The wait of each request is reserved under the lock and slept outside of it, so the waiting threads are released
+    in order, one every 1 / rate seconds
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, the bucket goes into debt when it is empty
+        :return: float - seconds to wait before sending the request
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> None:
+        """
+        Wait until a request can be sent
+        :return: None
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,201 @@
+import random
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import cloudscraper
+from cloudscraper.cloudflare import Cloudflare
+from urllib3.util.retry import Retry
+
+from . import TokenBucket
+
+
+class _JitterRetry(Retry):
+    """
+    urllib3 retry with a random jitter added to the exponential backoff, so parallel requests do not retry together
+    A retry to a rate limited host takes a token of the host, like the first attempt of the request
+    """
+
+    def __init__(self, *args, transport: Optional["Transport"] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transport = transport
+
+    def new(self, **kwargs) -> "_JitterRetry":
+        retry = super().new(**kwargs)
+        retry.transport = self.transport
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        # raise when the retries are exhausted, before waiting for a token
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if self.transport is not None and _pool is not None:
+            bucket = self.transport.get_bucket(_pool.host)
+            if bucket is not None:
+                bucket.acquire()
+        return retry
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff + random.uniform(0, backoff)
+
+
+class _ThreadSafeScraper(cloudscraper.CloudScraper):
+    """
+    cloudscraper session shared by the threads of the downloaders
+    The state of the Cloudflare challenges (loop counter, cookies and headers of the solution) is not thread-safe: the
+    requests are sent in parallel, but a challenge is solved by one thread at a time. The lock is taken by a post hook
+    of the request when its response is a challenge, and released once the request is done. A thread which waited for
+    the lock sends its request again first, as the challenge may have been solved meanwhile
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.challenge_lock = threading.RLock()
+        # number of challenges solved, to know if a challenge was solved while a thread waited for the lock
+        self.solved_challenges = 0
+        # requests in progress of the thread, the last one is the current request
+        self.local = threading.local()
+        super().__init__(*args, **kwargs)
+        self.next_post_hook = self.requestPostHook
+        self.requestPostHook = self._lock_challenge
+
+    def _lock_challenge(self, session: "cloudscraper.CloudScraper", response):
+        if self.next_post_hook is not None:
+            response = self.next_post_hook(session, response)
+        if self.disableCloudflareV1 or not Cloudflare(self).is_Challenge_Request(response):
+            return response
+        current = self.local.requests[-1]
+        if not current["locked"]:
+            self.challenge_lock.acquire()
+            current["locked"] = True
+            if self.solved_challenges != current["solved_challenges"]:
+                # solved by another thread: sent again with the cookies of the solution
+                response.close()
+                response = self.decodeBrotli(self.perform_request(*current["args"], **current["kwargs"]))
+        return response
+
+    def request(self, method, url, *args, **kwargs):
+        if not hasattr(self.local, "requests"):
+            self.local.requests = []
+        current = {"args": (method, url) + args, "kwargs": kwargs, "solved_challenges": self.solved_challenges,
+                   "locked": False}
+        self.local.requests.append(current)
+        try:
+            return super().request(method, url, *args, **kwargs)
+        finally:
+            self.local.requests.pop()
+            if current["locked"]:
+                self.solved_challenges += 1
+                self.challenge_lock.release()
+
+
+class Transport:
+    """
+    HTTP transport shared by the downloaders
+    A single cloudscraper session is used so connections are kept alive and reused between platforms hosted on the
+    same domain (ex: Mangas-Origines and Mangas-Origines-X), with pools sized once for the concurrency, timeouts and
+    retries with exponential backoff on 500 / 502 / 504 responses. The 403 / 429 / 503 responses are left to the
+    Cloudflare challenges handling of cloudscraper.
+    The requests are rate limited per host with a token bucket, at the rate set for the host (see set_host_rate), so
+    each host is requested at its own pace while the other hosts proceed in parallel. The requests to a host without
+    rate are not limited
+    """
+    _shared: Optional["Transport"] = None
+    _shared_lock = threading.Lock()
+
+    # kept-alive connections per host when the pools are not sized for the downloaders (the default of requests)
+    default_pool_size = 10
+
+    def __init__(self, pool_size: int = default_pool_size, connect_timeout: float = 10, read_timeout: float = 60,
+                 retries: int = 3, backoff_factor: float = 1):
+        """
+        :param pool_size: int - connections kept alive per host, the requests sent at the same time to a host
+        :param connect_timeout: float - seconds to connect to a host
+        :param read_timeout: float - seconds to wait for the response
+        :param retries: int - retries of a request answered with a 500 / 502 / 504 error
+        :param backoff_factor: float - base of the exponential backoff between the retries, in seconds
+        """
+        self.lock = threading.Lock()
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        # host (without "www.") -> rate limit of the requests sent to this host, set with set_host_rate
+        self.buckets: dict[str, TokenBucket] = {}
+        self.session = _ThreadSafeScraper.create_scraper(
+            browser={
+                'browser': 'firefox',
+                'platform': 'windows',
+                'mobile': False
+            },
+        )
+        retry = _JitterRetry(total=retries, backoff_factor=backoff_factor, transport=self,
+                             # the Cloudflare challenges are answered with 403 / 429 / 503, they are not retried
+                             status_forcelist=(500, 502, 504),
+                             # the chapters lists of the Madara websites are requested with POST
+                             allowed_methods=None, raise_on_status=False)
+        # configure the adapters mounted by cloudscraper: its https adapter sets the TLS ciphers
+        # the pools are sized before the first request, they are never replaced while requests are in flight
+        for adapter in self.session.adapters.values():
+            adapter.max_retries = retry
+            adapter._pool_connections = pool_size
+            adapter._pool_maxsize = pool_size
+            adapter.init_poolmanager(pool_size, pool_size)
+
+    @classmethod
+    def get_shared(cls, pool_size: int = default_pool_size) -> "Transport":
+        """
+        Get the transport shared by all downloaders
+        :param pool_size: int - connections kept alive per host, used when the shared transport is created
+        :return: Transport - the shared transport
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(pool_size)
+            return cls._shared
+
+    @staticmethod
+    def _get_host(host: str) -> str:
+        host = host.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def set_host_rate(self, host: str, requests_per_second: float, burst: int = 1) -> None:
+        """
+        Set the rate limit of a host, the rate of a host is kept when it is set again with the same values
+        :param host: str - host (with or without "www.")
+        :param requests_per_second: float - requests per second allowed to the host
+        :param burst: int - requests sent at once to the host before being limited
+        :return: None
+        """
+        host = self._get_host(host)
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None or bucket.rate != requests_per_second or bucket.burst != max(1, burst):
+                self.buckets[host] = TokenBucket(requests_per_second, burst)
+
+    def get_bucket(self, host: str) -> Optional[TokenBucket]:
+        """
+        Get the rate limit of a host
+        :param host: str - host (with or without "www.")
+        :return: Optional[TokenBucket] - rate limit of the host, None when the host is not limited
+        """
+        with self.lock:
+            return self.buckets.get(self._get_host(host))
+
+    def request(self, method: str, link: str, **kwargs):
+        """
+        Send a request once the rate limit of the host of the link allows it (the retries wait too), with the default
+        timeouts when none is given
+        :param method: str - HTTP method
+        :param link: str - requested link
+        :param kwargs: arguments of requests.Session.request
+        :return: requests.Response - the response
+        """
+        bucket = self.get_bucket(urlsplit(link).hostname or "")
+        if bucket is not None:
+            bucket.acquire()
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, link, **kwargs)
+
+    def get(self, link: str, **kwargs):
+        return self.request("GET", link, **kwargs)
+
+    def post(self, link: str, **kwargs):
+        return self.request("POST", link, **kwargs)
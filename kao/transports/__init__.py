@@ -0,0 +1,2 @@
+from .TokenBucket import TokenBucket
+from .Transport import Transport
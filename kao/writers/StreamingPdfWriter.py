@@ -0,0 +1,292 @@
+import io
+import os
+import struct
+import zlib
+from typing import BinaryIO, Iterable, Optional, Union
+
+from PIL import Image
+
+
+class StreamingPdfWriter:
+    """
+    PDF writer adding the images to the file one page at a time, so the memory used does not grow with the chapter
+    JPEG images and 8 bits gray / RGB PNG images are embedded as is (no decoding), the other images are decoded and
+    compressed losslessly (Flate), their alpha channel is kept as a soft mask. The file is written next to its path and
+    moved in place once complete.
+    """
+    # dpi used when the image does not give one, a pixel is then 0.75 point like with img2pdf
+    default_dpi = 96
+    # bytes read / compressed at once when writing a stream
+    chunk_size = 1024 * 1024
+    color_spaces = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}
+    # EXIF orientation -> rotation of the page
+    exif_rotations = {3: 180, 6: 90, 8: 270}
+    # PNG color type -> number of colors, for the PNG embedded as is
+    png_colors = {0: 1, 2: 3}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.part_path = path + ".part"
+        self.file: Optional[BinaryIO] = None
+        # offset of each object in the file, the object number n is at index n - 1
+        self.offsets: list[Optional[int]] = []
+        self.pages: list[int] = []
+        # the catalog and the pages tree are written at the end, once all pages are known
+        self.catalog_id = self._reserve()
+        self.pages_id = self._reserve()
+
+    def __enter__(self) -> "StreamingPdfWriter":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self) -> None:
+        self.file = open(self.part_path, "wb")
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def close(self) -> None:
+        """
+        Write the pages tree, the catalog and the cross-reference table, then move the file in place
+        :return: None
+        """
+        kids = " ".join("{} 0 R".format(page_id) for page_id in self.pages)
+        self._write_object(self.pages_id, "<< /Type /Pages /Kids [{}] /Count {} >>".format(kids, len(self.pages)))
+        self._write_object(self.catalog_id, "<< /Type /Catalog /Pages {} 0 R >>".format(self.pages_id))
+
+        xref_offset = self.file.tell()
+        self.file.write("xref\n0 {}\n0000000000 65535 f \n".format(len(self.offsets) + 1).encode("ascii"))
+        for offset in self.offsets:
+            self.file.write("{:010d} 00000 n \n".format(offset).encode("ascii"))
+        self.file.write("trailer\n<< /Size {} /Root {} 0 R >>\nstartxref\n{}\n%%EOF\n"
+                        .format(len(self.offsets) + 1, self.catalog_id, xref_offset).encode("ascii"))
+        self.file.close()
+        os.replace(self.part_path, self.path)
+
+    def abort(self) -> None:
+        """
+        Remove the incomplete file
+        :return: None
+        """
+        self.file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    @classmethod
+    def can_embed(cls, image: Union[str, bytes]) -> bool:
+        """
+        Check if the image is embedded as is, without decoding it
+        :param image: Union[str, bytes] - path or content of the image
+        :return: bool - True for JPEG images (gray, RGB, CMYK) and 8 bits gray / RGB non-interlaced PNG images
+        """
+        if cls._get_png_header(image) is not None:
+            return True
+        with Image.open(image if isinstance(image, str) else io.BytesIO(image)) as img:
+            return img.format == "JPEG" and img.mode in cls.color_spaces
+
+    @classmethod
+    def _get_png_header(cls, image: Union[str, bytes]) -> Optional[tuple[int, int, int]]:
+        """
+        Read the header of a PNG image embedded as is
+        :param image: Union[str, bytes] - path or content of the image
+        :return: Optional[tuple[int, int, int]] - width, height and colors of the image, None when the image is not a
+         PNG image that can be embedded as is
+        """
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                header = f.read(33)
+        else:
+            header = image[:33]
+        if len(header) < 33 or header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+            return None
+        width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header[16:29])
+        if bit_depth != 8 or color_type not in cls.png_colors or interlace != 0:
+            return None
+        return width, height, cls.png_colors[color_type]
+
+    def add_image(self, image: Union[str, bytes]) -> None:
+        """
+        Add the image as a new page (a page per frame for animated images)
+        :param image: Union[str, bytes] - path or content of the image
+        :return: None
+        """
+        with Image.open(image if isinstance(image, str) else io.BytesIO(image)) as img:
+            dpi = self._get_dpi(img)
+            rotation = self.exif_rotations.get(img.getexif().get(0x0112), 0)
+            if img.format == "JPEG" and img.mode in self.color_spaces:
+                self._add_page(img.size, dpi, rotation, self._add_jpeg(image, img))
+                return
+            png_header = self._get_png_header(image) if img.format == "PNG" else None
+            if png_header is not None:
+                self._add_page(img.size, dpi, rotation, self._add_png(image, *png_header))
+                return
+            for frame in range(getattr(img, "n_frames", 1)):
+                img.seek(frame)
+                self._add_page(img.size, dpi, rotation, self._add_decoded(img))
+
+    def _get_dpi(self, img: Image.Image) -> tuple[float, float]:
+        dpi = img.info.get("dpi", (self.default_dpi, self.default_dpi))
+        try:
+            return tuple(float(d) if float(d) > 0 else self.default_dpi for d in dpi[:2])
+        except (TypeError, ValueError):
+            return self.default_dpi, self.default_dpi
+
+    def _reserve(self) -> int:
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _begin_object(self, obj_id: int) -> None:
+        self.offsets[obj_id - 1] = self.file.tell()
+        self.file.write("{} 0 obj\n".format(obj_id).encode("ascii"))
+
+    def _write_object(self, obj_id: int, body: str) -> None:
+        self._begin_object(obj_id)
+        self.file.write(body.encode("ascii"))
+        self.file.write(b"\nendobj\n")
+
+    def _write_stream(self, entries: str, chunks: Iterable[bytes]) -> int:
+        """
+        Write a stream object chunk by chunk, its length is written after it as an indirect object
+        :param entries: str - entries of the stream dictionary, without /Length
+        :param chunks: Iterable[bytes] - content of the stream
+        :return: int - number of the stream object
+        """
+        obj_id = self._reserve()
+        length_id = self._reserve()
+        self._begin_object(obj_id)
+        self.file.write("<< {} /Length {} 0 R >>\nstream\n".format(entries, length_id).encode("ascii"))
+        length = 0
+        for chunk in chunks:
+            self.file.write(chunk)
+            length += len(chunk)
+        self.file.write(b"\nendstream\nendobj\n")
+        self._write_object(length_id, str(length))
+        return obj_id
+
+    def _read_chunks(self, image: Union[str, bytes]) -> Iterable[bytes]:
+        if not isinstance(image, str):
+            yield image
+            return
+        with open(image, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                yield chunk
+
+    def _read_png_data(self, image: Union[str, bytes]) -> Iterable[bytes]:
+        """
+        Read the compressed pixels of a PNG image (content of its IDAT chunks)
+        :param image: Union[str, bytes] - path or content of the image
+        :return: Iterable[bytes] - the compressed pixels
+        """
+        with (open(image, "rb") if isinstance(image, str) else io.BytesIO(image)) as f:
+            f.seek(8)
+            while True:
+                chunk_header = f.read(8)
+                if len(chunk_header) < 8:
+                    return
+                length, chunk_type = struct.unpack(">I4s", chunk_header)
+                if chunk_type == b"IEND":
+                    return
+                if chunk_type != b"IDAT":
+                    f.seek(length + 4, os.SEEK_CUR)
+                    continue
+                while length > 0:
+                    data = f.read(min(length, self.chunk_size))
+                    if not data:
+                        return
+                    length -= len(data)
+                    yield data
+                # CRC of the chunk
+                f.seek(4, os.SEEK_CUR)
+
+    def _compress_chunks(self, data: bytes) -> Iterable[bytes]:
+        compressor = zlib.compressobj()
+        view = memoryview(data)
+        for start in range(0, len(view), self.chunk_size):
+            yield compressor.compress(view[start:start + self.chunk_size])
+        yield compressor.flush()
+
+    def _add_jpeg(self, image: Union[str, bytes], img: Image.Image) -> int:
+        """
+        Embed a JPEG image without decoding it
+        :param image: Union[str, bytes] - path or content of the image
+        :param img: Image.Image - the opened image
+        :return: int - number of the image object
+        """
+        entries = "/Type /XObject /Subtype /Image /Width {} /Height {} /ColorSpace {} /BitsPerComponent 8 " \
+                  "/Filter /DCTDecode".format(img.width, img.height, self.color_spaces[img.mode])
+        if img.mode == "CMYK" and "adobe" in img.info:
+            # Adobe CMYK JPEG are stored inverted
+            entries += " /Decode [1 0 1 0 1 0 1 0]"
+        return self._write_stream(entries, self._read_chunks(image))
+
+    def _add_png(self, image: Union[str, bytes], width: int, height: int, colors: int) -> int:
+        """
+        Embed a PNG image without decoding it, the PNG filters are undone by the PDF reader (predictor 15)
+        :param image: Union[str, bytes] - path or content of the image
+        :param width: int - width of the image
+        :param height: int - height of the image
+        :param colors: int - number of colors of a pixel (1 for gray, 3 for RGB)
+        :return: int - number of the image object
+        """
+        entries = "/Type /XObject /Subtype /Image /Width {} /Height {} /ColorSpace {} /BitsPerComponent 8 " \
+                  "/Filter /FlateDecode /DecodeParms << /Predictor 15 /Colors {} /BitsPerComponent 8 /Columns {} >>" \
+            .format(width, height, "/DeviceGray" if colors == 1 else "/DeviceRGB", colors, width)
+        return self._write_stream(entries, self._read_png_data(image))
+
+    def _add_decoded(self, img: Image.Image) -> int:
+        """
+        Embed the pixels of an image, compressed losslessly
+        :param img: Image.Image - the opened image
+        :return: int - number of the image object
+        """
+        if img.mode in ("P", "PA"):
+            img = img.convert("RGBA" if img.mode == "PA" or "transparency" in img.info else "RGB")
+        elif img.mode == "1" or img.mode.startswith("I") or img.mode == "F":
+            img = img.convert("L")
+
+        smask_id = None
+        if img.mode in ("RGBA", "LA"):
+            alpha = img.getchannel("A")
+            img = img.convert(img.mode[:-1])
+            if alpha.getextrema() != (255, 255):
+                smask_id = self._add_pixels(alpha)
+        elif img.mode not in ("RGB", "L", "CMYK"):
+            img = img.convert("RGB")
+        return self._add_pixels(img, smask_id)
+
+    def _add_pixels(self, img: Image.Image, smask_id: Optional[int] = None) -> int:
+        entries = "/Type /XObject /Subtype /Image /Width {} /Height {} /ColorSpace {} /BitsPerComponent 8 " \
+                  "/Filter /FlateDecode".format(img.width, img.height, self.color_spaces[img.mode])
+        if smask_id is not None:
+            entries += " /SMask {} 0 R".format(smask_id)
+        return self._write_stream(entries, self._compress_chunks(img.tobytes()))
+
+    def _add_page(self, size: tuple[int, int], dpi: tuple[float, float], rotation: int, image_id: int) -> None:
+        """
+        Add a page displaying an image
+        :param size: tuple[int, int] - size of the image in pixels
+        :param dpi: tuple[float, float] - horizontal and vertical resolution of the image
+        :param rotation: int - rotation of the page in degrees
+        :param image_id: int - number of the image object
+        :return: None
+        """
+        width = _format_number(size[0] * 72 / dpi[0])
+        height = _format_number(size[1] * 72 / dpi[1])
+        content = "q\n{w} 0 0 {h} 0 0 cm\n/Im0 Do\nQ".format(w=width, h=height).encode("ascii")
+        content_id = self._write_stream("", [content])
+
+        page_id = self._reserve()
+        page = "<< /Type /Page /Parent {} 0 R /MediaBox [0 0 {} {}] /Resources << /XObject << /Im0 {} 0 R >> >> " \
+               "/Contents {} 0 R".format(self.pages_id, width, height, image_id, content_id)
+        if rotation:
+            page += " /Rotate {}".format(rotation)
+        self._write_object(page_id, page + " >>")
+        self.pages.append(page_id)
+
+
+def _format_number(number: float) -> str:
+    return "{:.4f}".format(number).rstrip("0").rstrip(".")
@@ -0,0 +1 @@
+from .StreamingPdfWriter import StreamingPdfWriter
@@ -13,13 +13,12 @@ setuptools.setup(
     install_requires=[
         "requests",
         "requests_html",
-        "img2pdf",
         "cloudscraper",
-        "beautifulsoup4",
         "lxml",
-        "bs4",
+        "cssselect",
         "Pillow",
         "validators",
+        "numpy",
     ],
     long_description=long_description,
     classifiers=[
@@ -0,0 +1,102 @@
+import http.server
+import io
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kao.downloaders import Downloader  # noqa: E402
+
+
+class LocalSite:
+    """
+    Website served on localhost: a chapter page with its pictures
+    The requests are recorded in hits, the pictures whose name is in broken are answered with a content which is not
+    a picture, the paths in unavailable are answered with the unavailable_status error
+    """
+
+    def __init__(self, pages: int = 16):
+        self.pages = pages
+        self.hits: list[str] = []
+        self.broken: set[str] = set()
+        self.unavailable: set[str] = set()
+        self.unavailable_status = 502
+        self.lock = threading.Lock()
+        rng = np.random.default_rng(0)
+        self.pictures = {}
+        for index in range(pages):
+            output = io.BytesIO()
+            Image.fromarray((rng.random((300, 200, 3)) * 255).astype(np.uint8)).save(output, format="JPEG")
+            self.pictures["{}.jpg".format(index)] = output.getvalue()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._get_handler())
+        self.base_link = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        self.chapter_link = "{}/chapter.html".format(self.base_link)
+
+    def _get_handler(self) -> type:
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                name = self.path.strip("/")
+                with site.lock:
+                    site.hits.append(name)
+                if name in site.unavailable:
+                    self.send_response(site.unavailable_status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if name == "chapter.html":
+                    content = site.get_chapter_page()
+                elif name in site.pictures:
+                    content = b"not a picture" * 100 if name in site.broken else site.pictures[name]
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        return Handler
+
+    def get_chapter_page(self) -> bytes:
+        pictures = "".join('<img src="{}/{}.jpg"/>'.format(self.base_link, index) for index in range(self.pages))
+        return ('<html><body><h1>Series</h1><h2>Chapter 1</h2><div class="reading-content">{}</div></body></html>'
+                .format(pictures).encode())
+
+    def get_pictures_hits(self) -> list[str]:
+        with self.lock:
+            return [name for name in self.hits if name.endswith(".jpg")]
+
+
+class LocalDownloader(Downloader):
+    platform = "Local"
+
+    @classmethod
+    def extract_pictures_links_from_webpage(cls, dom) -> list[str]:
+        return [img.get("src") for img in dom.xpath('//*[@class="reading-content"]//img')]
+
+    def download_chapter(self, link: str, force_re_dl: bool = False, keep_img: bool = False,
+                         full_logs: bool = False):
+        soup, dom = self._get_page_content(link)
+        return self._download_chapter_files(dom, soup.find("h1").text, soup.find("h2").text, link, force_re_dl,
+                                            keep_img, full_logs, link)
+
+
+@pytest.fixture
+def local_site():
+    site = LocalSite()
+    thread = threading.Thread(target=site.server.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import LocalDownloader
+
+
+@pytest.mark.parametrize("keep_img", [False, True])
+def test_retry_fetches_only_the_missing_pages(local_site, tmp_path, keep_img):
+    downloader = LocalDownloader(str(tmp_path), [])
+    local_site.broken = {"3.jpg", "9.jpg"}
+    with pytest.raises(Exception):
+        downloader.download_chapter(local_site.chapter_link, keep_img=keep_img)
+
+    local_site.broken = set()
+    local_site.hits.clear()
+    chapter = downloader.download_chapter(local_site.chapter_link, keep_img=keep_img)
+
+    assert sorted(local_site.get_pictures_hits()) == ["3.jpg", "9.jpg"]
+    chapter_path = tmp_path / "Local" / "Series" / "Chapter 1"
+    if keep_img:
+        assert len([path for path in chapter_path.iterdir() if not path.name.startswith(".")]) == local_site.pages
+    else:
+        images = chapter.get_images()
+        assert len(images) == local_site.pages
+        assert [image[1] if isinstance(image, tuple) else open(image, "rb").read() for image in images] == \
+            [local_site.pictures["{}.jpg".format(index)] for index in range(local_site.pages)]
+    assert not [path for path in chapter_path.iterdir() if path.name.startswith(".kao")]
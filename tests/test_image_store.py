@@ -0,0 +1,15 @@
+import pytest
+
+from conftest import LocalDownloader
+from kao.storages import ImageStore
+
+
+@pytest.mark.parametrize("keep_img", [False, True])
+def test_store_holds_only_the_kept_pictures(local_site, tmp_path, keep_img):
+    downloader = LocalDownloader(str(tmp_path), [])
+    downloader.set_image_store(ImageStore(str(tmp_path)))
+    downloader.download_chapter(local_site.chapter_link, keep_img=keep_img)
+
+    store_path = tmp_path / ImageStore.folder_name
+    stored_pictures = [path for path in store_path.rglob("*") if path.is_file()] if store_path.exists() else []
+    assert len(stored_pictures) == (local_site.pages if keep_img else 0)
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from pathlib import Path
+
+root_path = Path(__file__).parent.parent
+
+
+def get_imported_modules(code: str) -> set[str]:
+    # a new interpreter, the modules of the other tests are already imported in this one
+    output = subprocess.check_output([sys.executable, "-c", code + "\nimport sys\nprint('\\n'.join(sys.modules))"],
+                                     cwd=root_path, text=True)
+    return set(output.split())
+
+
+def test_import_does_not_load_the_downloaders():
+    modules = get_imported_modules("import kao")
+    assert not [name for name in modules if name.startswith("kao.downloaders.") and name.endswith("Downloader")]
+    assert "cloudscraper" not in modules
+
+
+def test_registry_does_not_load_the_downloaders():
+    modules = get_imported_modules("import kao\nregistry = kao.DownloaderRegistry.create_default('downloads')\n"
+                                   "kao.parser_utils.create_parser()\nprint(', '.join(registry))")
+    assert not [name for name in modules if name.startswith("kao.downloaders.") and name.endswith("Downloader")]
+    assert "cloudscraper" not in modules
+
+
+def test_classifying_links_does_not_load_the_downloaders(tmp_path):
+    chapter_path = tmp_path / "Series" / "Chapter 1"
+    chapter_path.mkdir(parents=True)
+    (chapter_path / "1.jpg").write_bytes(b"")
+    links = ["https://www.webtoons.com/en/fantasy/tower-of-god/list?title_no=95",
+             "https://manga18.club/manhwa/series-name/chapter-1", str(tmp_path / "Series"), str(chapter_path)]
+    modules = get_imported_modules("import kao\nregistry = kao.DownloaderRegistry.create_default('downloads')\n"
+                                   "links = {!r}\n".format(links) +
+                                   "assert registry.is_a_series_link('Webtoon', links[0])\n"
+                                   "assert registry.is_a_chapter_link('Manga18.club', links[1])\n"
+                                   "assert registry.is_a_series_link('PersonalDownloader', links[2])\n"
+                                   "assert registry.is_a_chapter_link('PersonalDownloader', links[3])")
+    assert not [name for name in modules if name.startswith("kao.downloaders.")]
+    assert not {"cloudscraper", "lxml", "PIL"} & modules
+
+
+def test_sorting_links_loads_only_the_downloaders_of_the_downloads():
+    modules = get_imported_modules("import kao\nregistry = kao.DownloaderRegistry.create_default('downloads')\n"
+                                   "kao.kao_utils.get_series_and_chapters_from_links(registry, "
+                                   "['https://www.webtoons.com/en/fantasy/tower-of-god/list?title_no=95'], [])")
+    assert not [name for name in modules if name.startswith("kao.downloaders.") and name.endswith("Downloader")
+                and not name.startswith("kao.downloaders.bases.")]
@@ -0,0 +1,43 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from kao import kao_utils
+
+
+def get_png(pixels: np.ndarray) -> bytes:
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_embeddable_images_are_passed_through():
+    content = get_png((np.random.default_rng(0).random((64, 48, 3)) * 255).astype(np.uint8))
+
+    images, converted_images = kao_utils.transcode_images([("1.png", content)])
+
+    assert converted_images == 0
+    assert images == [("1.png", content)]
+
+
+# 16 bits gray PNG (I;16 mode) and float TIFF (F mode)
+@pytest.mark.parametrize("pixels, image_format", [
+    (np.arange(256 * 256, dtype=np.uint16).reshape(256, 256), "PNG"),
+    (np.linspace(0, 1, 256 * 256, dtype=np.float32).reshape(256, 256), "TIFF"),
+])
+def test_high_bit_depth_images_are_scaled_to_8_bits(pixels, image_format):
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format=image_format)
+
+    images, converted_images = kao_utils.transcode_images([("1.img", output.getvalue())])
+
+    assert converted_images == 1
+    with Image.open(io.BytesIO(images[0][1])) as image:
+        assert image.format == "PNG" and image.mode == "L"
+        converted = np.asarray(image)
+    # the gradient is kept instead of being clipped to white
+    assert converted.min() == 0 and converted.max() == 255
+    assert (converted == 255).mean() < 0.01
+    assert np.all(np.diff(converted.ravel().astype(np.int16)) >= 0)
@@ -0,0 +1,42 @@
+import time
+
+from conftest import LocalDownloader
+from kao.transports import Transport
+
+
+def test_retries_wait_for_the_rate_limit_of_the_host(local_site):
+    transport = Transport(retries=3, backoff_factor=0)
+    transport.set_host_rate("127.0.0.1", 20, 1)
+    local_site.unavailable = {"chapter.html"}
+
+    start = time.monotonic()
+    response = transport.get(local_site.chapter_link)
+
+    assert response.status_code == 502
+    assert local_site.hits.count("chapter.html") == 4
+    # the first attempt takes the token of the burst, each of the 3 retries waits for a token
+    assert time.monotonic() - start >= 3 / 20 - 0.01
+
+
+def test_challenge_responses_are_not_retried(local_site):
+    transport = Transport(retries=3, backoff_factor=0)
+    local_site.unavailable = {"chapter.html"}
+    local_site.unavailable_status = 503
+
+    response = transport.get(local_site.chapter_link)
+
+    # a 503 without Cloudflare challenge is given as is, a challenge would be solved by cloudscraper
+    assert response.status_code == 503
+    assert local_site.hits.count("chapter.html") == 1
+
+
+def test_pictures_take_the_tokens_of_their_host(local_site, tmp_path):
+    downloader = LocalDownloader(str(tmp_path), [], Transport())
+    # a burst for the whole chapter, the bucket is almost not refilled during the download
+    downloader.transport.set_host_rate("127.0.0.1", 0.001, 100)
+
+    downloader.download_chapter(local_site.chapter_link, keep_img=True)
+
+    assert len(local_site.get_pictures_hits()) == local_site.pages
+    # the page and each picture took a token
+    assert round(100 - downloader.transport.get_bucket("127.0.0.1").tokens) == len(local_site.hits)